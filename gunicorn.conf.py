@@ -0,0 +1,24 @@
+# Gunicorn production profile (Linux):
+#   gunicorn -c gunicorn.conf.py store_management.wsgi:application
+#
+# Every worker process has its own connection pool of WEB_THREADS
+# connections (see settings.py), so the database must accept
+# WEB_WORKERS * WEB_THREADS connections.
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_WORKERS',
+                             min(multiprocessing.cpu_count() + 1, 4)))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 8))
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to cap memory growth
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = '-'
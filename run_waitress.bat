@@ -4,5 +4,9 @@ REM Script to be use for NSSM
 REM Need complete path
 call "D:\devdj\store_management\.venv\Scripts\activate.bat"
 
+REM One database connection per Waitress thread (see WEB_THREADS / DB_POOL in settings.py)
+if not defined WEB_THREADS set WEB_THREADS=8
+if not defined DB_POOL set DB_POOL=True
+
 REM Waitress start
-waitress-serve --port=8000 store_management.wsgi:application
+waitress-serve --port=8000 --threads=%WEB_THREADS% --channel-timeout=60 --connection-limit=200 store_management.wsgi:application
@@ -1,7 +1,21 @@
 # admin.py
-from django.contrib import admin
+import datetime
+
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Q
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
 from django.utils.html import format_html
-from .models import Category, Product, Customer, Sale, SaleItem, StockMovement
+from .models import Category, Product, Customer, CustomerStats, Sale, \
+    SaleItem, StockMovement, RequestProfile, Location, LocationStock, \
+    AuditEvent, PriceHistory, Promotion, DayClose, Supplier, PurchaseOrder, \
+    PurchaseOrderItem, GoodsReceipt, GoodsReceiptItem
+from .closing import day_range
+from .pricing import record_price
+from .services import search_customers, cancel_sales
+from . import audit
 
 
 @admin.register(Category)
@@ -15,6 +29,30 @@ class CategoryAdmin(admin.ModelAdmin):
     product_count.short_description = 'Products'
 
 
+@admin.register(Location)
+class LocationAdmin(admin.ModelAdmin):
+    list_display = ['name', 'code', 'active', 'created_at']
+    list_filter = ['active']
+    search_fields = ['name', 'code']
+    prepopulated_fields = {'code': ['name']}
+
+
+@admin.register(LocationStock)
+class LocationStockAdmin(admin.ModelAdmin):
+    list_display = ['product', 'location', 'quantity']
+    list_filter = ['location']
+    search_fields = ['product__name', 'product__barcode']
+    list_select_related = ['product', 'location']
+    readonly_fields = ['product', 'location', 'quantity']
+
+    # Stock only changes through stock movements
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['name', 'category', 'price', 'stock_display', 'active',
@@ -22,7 +60,8 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ['active', 'category', 'created_at']
     search_fields = ['name', 'barcode', 'description']
     list_editable = ['active']
-    readonly_fields = ['created_at', 'updated_at']
+    # Total of the per-location stock, changed through stock movements
+    readonly_fields = ['stock', 'created_at', 'updated_at']
 
     fieldsets = (
         ('Basic Information', {
@@ -41,6 +80,20 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     )
 
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            if change:
+                # Only the edited columns: stock moves with concurrent sales
+                obj.save_fields(form.changed_data)
+            else:
+                super().save_model(request, obj, form, change)
+            if not change or {'price', 'cost'} & set(form.changed_data):
+                record_price(obj, request.user,
+                             'Alteração manual' if change else 'Preço inicial')
+        if change and 'price' in form.changed_data:
+            audit.record('price_changed', obj, request.user,
+                         old=form.initial['price'], new=obj.price)
+
     def stock_display(self, obj):
         if obj.is_low_stock:
             return format_html(
@@ -52,47 +105,223 @@ class ProductAdmin(admin.ModelAdmin):
     stock_display.short_description = 'Stock'
 
 
+@admin.register(PriceHistory)
+class PriceHistoryAdmin(admin.ModelAdmin):
+    list_display = ['product', 'price', 'cost', 'effective_from', 'applied_at',
+                    'reason', 'user']
+    list_filter = ['effective_from', 'applied_at']
+    search_fields = ['product__name', 'reason']
+    list_select_related = ['product', 'user']
+    date_hierarchy = 'effective_from'
+    readonly_fields = [field.name for field in PriceHistory._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'kind', 'product', 'category', 'percent', 'amount',
+                    'starts_at', 'ends_at', 'active']
+    list_filter = ['kind', 'active']
+    list_editable = ['active']
+    search_fields = ['name', 'product__name', 'category__name']
+    list_select_related = ['product', 'category']
+    autocomplete_fields = ['product']
+    fieldsets = (
+        (None, {
+            'fields': ('name', 'kind', 'active', 'starts_at', 'ends_at')
+        }),
+        ('Aplica-se a (vazio = todos os produtos)', {
+            'fields': ('product', 'category')
+        }),
+        ('Regra', {
+            'fields': ('percent', 'amount', 'min_quantity', 'buy_quantity',
+                       'free_quantity', 'min_total')
+        }),
+    )
+
+
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
     list_display = ['name', 'phone', 'email', 'cpf', 'total_purchases',
+                    'lifetime_revenue', 'average_ticket', 'last_purchase',
                     'created_at']
+    list_select_related = ['stats']
     search_fields = ['name', 'phone', 'email', 'cpf']
     readonly_fields = ['created_at']
 
+    def get_search_results(self, request, queryset, search_term):
+        # Same indexed search path as customer_list
+        return search_customers(queryset, search_term), False
+
+    # All values come from the joined CustomerStats row, no per-row queries
+    def _stats(self, obj):
+        try:
+            return obj.stats
+        except CustomerStats.DoesNotExist:
+            return None
+
     def total_purchases(self, obj):
-        return obj.sales.count()
+        stats = self._stats(obj)
+        return stats.sale_count if stats else 0
 
     total_purchases.short_description = 'Total Purchases'
+    total_purchases.admin_order_field = 'stats__sale_count'
+
+    def lifetime_revenue(self, obj):
+        stats = self._stats(obj)
+        return f'R$ {stats.lifetime_revenue:.2f}' if stats else 'R$ 0.00'
+
+    lifetime_revenue.short_description = 'Lifetime Revenue'
+    lifetime_revenue.admin_order_field = 'stats__lifetime_revenue'
+
+    def average_ticket(self, obj):
+        stats = self._stats(obj)
+        return f'R$ {stats.average_ticket:.2f}' if stats else 'R$ 0.00'
+
+    average_ticket.short_description = 'Average Ticket'
+    average_ticket.admin_order_field = 'stats__average_ticket'
+
+    def last_purchase(self, obj):
+        stats = self._stats(obj)
+        return stats.last_purchase_at if stats else None
+
+    last_purchase.short_description = 'Last Purchase'
+    last_purchase.admin_order_field = 'stats__last_purchase_at'
 
 
 class SaleItemInline(admin.TabularInline):
     model = SaleItem
     extra = 0
-    readonly_fields = ['product', 'quantity', 'price', 'subtotal']
+    readonly_fields = ['product', 'quantity', 'price', 'discount',
+                       'promotion', 'subtotal']
     can_delete = False
 
     def subtotal(self, obj):
-        return f'R$ {obj.subtotal:.2f}'
+        if obj.price is None:  # empty inline form
+            return '-'
+        return f'R$ {obj.net_subtotal:.2f}'
 
 
 @admin.register(Sale)
 class SaleAdmin(admin.ModelAdmin):
-    list_display = ['id', 'customer', 'user', 'payment_method',
-                    'total_display', 'created_at']
-    list_filter = ['payment_method', 'created_at']
+    list_display = ['id', 'customer', 'user', 'location', 'payment_method',
+                    'status', 'total_display', 'created_at']
+    list_filter = ['status', 'location', 'payment_method', 'created_at']
+    list_select_related = ['customer', 'user', 'location']
     search_fields = ['customer__name', 'user__username']
-    readonly_fields = ['created_at', 'total', 'discount']
+    readonly_fields = ['created_at', 'total', 'discount', 'day_close']
     inlines = [SaleItemInline]
     date_hierarchy = 'created_at'
+    actions = ['cancel_selected']
 
     def total_display(self, obj):
         return format_html(
-            '<strong style="color: green;">R$ {:.2f}</strong>',
-            obj.final_total
+            '<strong style="color: green;">R$ {}</strong>',
+            f'{obj.final_total:.2f}'
         )
 
     total_display.short_description = 'Total'
 
+    @admin.action(description='Cancelar vendas selecionadas (devolve o estoque)',
+                  permissions=['cancel'])
+    def cancel_selected(self, request, queryset):
+        try:
+            cancelled = cancel_sales(
+                list(queryset.values_list('pk', flat=True)), request.user,
+                'Cancelada pelo admin')
+        except ValueError as error:
+            self.message_user(request, str(error), messages.ERROR)
+            return
+        self.message_user(request,
+                          f'{len(cancelled)} venda(s) cancelada(s). Estoque devolvido.')
+
+    def has_cancel_permission(self, request):
+        # Same rule as the cancel page: superusers only
+        return request.user.is_superuser
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DayClose)
+class DayCloseAdmin(admin.ModelAdmin):
+    list_display = ['day', 'location', 'sale_count', 'item_count', 'total',
+                    'cancelled_count', 'closed_by', 'closed_at']
+    list_filter = ['location', 'day']
+    list_select_related = ['location', 'closed_by']
+    date_hierarchy = 'day'
+    readonly_fields = [field.name for field in DayClose._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # Closed days are final (their sales point to them)
+        return False
+
+
+@admin.register(Supplier)
+class SupplierAdmin(admin.ModelAdmin):
+    list_display = ['name', 'cnpj', 'phone', 'email', 'active']
+    list_filter = ['active']
+    search_fields = ['name', 'cnpj', 'email']
+
+
+class PurchaseOrderItemInline(admin.TabularInline):
+    model = PurchaseOrderItem
+    extra = 0
+    autocomplete_fields = ['product']
+    readonly_fields = ['received_quantity']
+
+
+@admin.register(PurchaseOrder)
+class PurchaseOrderAdmin(admin.ModelAdmin):
+    list_display = ['id', 'supplier', 'location', 'status', 'created_by',
+                    'created_at']
+    list_filter = ['status', 'location', 'supplier']
+    list_select_related = ['supplier', 'location', 'created_by']
+    search_fields = ['supplier__name']
+    # Receiving goes through the app (store.purchasing.receive_goods)
+    readonly_fields = ['status', 'created_by', 'created_at']
+    inlines = [PurchaseOrderItemInline]
+    date_hierarchy = 'created_at'
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+
+class GoodsReceiptItemInline(admin.TabularInline):
+    model = GoodsReceiptItem
+    extra = 0
+    readonly_fields = ['product', 'order_item', 'quantity', 'unit_cost']
+    can_delete = False
+
+
+@admin.register(GoodsReceipt)
+class GoodsReceiptAdmin(admin.ModelAdmin):
+    list_display = ['id', 'order', 'location', 'invoice_number', 'total',
+                    'received_by', 'received_at']
+    list_filter = ['location', 'received_at']
+    list_select_related = ['order__supplier', 'location', 'received_by']
+    search_fields = ['invoice_number', 'order__supplier__name']
+    readonly_fields = [field.name for field in GoodsReceipt._meta.fields]
+    inlines = [GoodsReceiptItemInline]
+    date_hierarchy = 'received_at'
+
+    # Receipts already moved the stock and the costs
     def has_add_permission(self, request):
         return False
 
@@ -102,9 +331,9 @@ class SaleAdmin(admin.ModelAdmin):
 
 @admin.register(StockMovement)
 class StockMovementAdmin(admin.ModelAdmin):
-    list_display = ['product', 'movement_type', 'quantity', 'reason', 'user',
-                    'created_at']
-    list_filter = ['movement_type', 'created_at']
+    list_display = ['product', 'location', 'movement_type', 'quantity',
+                    'reason', 'user', 'created_at']
+    list_filter = ['location', 'movement_type', 'created_at']
     search_fields = ['product__name', 'reason']
     readonly_fields = ['created_at', 'user']
     date_hierarchy = 'created_at'
@@ -116,6 +345,96 @@ class StockMovementAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'method', 'path', 'view_name', 'status_code',
+                    'duration_ms', 'peak_memory_kb', 'query_count', 'user']
+    list_filter = ['view_name', 'method']
+    search_fields = ['path', 'view_name']
+    date_hierarchy = 'created_at'
+    list_select_related = ['user']
+    readonly_fields = [field.name for field in RequestProfile._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    # Append-only log: read-only, with keyset ("cursor") pagination instead
+    # of the changelist's COUNT(*) + OFFSET, which degrade on large tables
+    page_size = 100
+    readonly_fields = [field.name for field in AuditEvent._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        params = request.GET
+        events = AuditEvent.objects.select_related('user')
+        if params.get('event_type'):
+            events = events.filter(event_type=params['event_type'])
+        if params.get('entity_type'):
+            events = events.filter(entity_type=params['entity_type'])
+        if params.get('entity_id', '').isdigit():
+            events = events.filter(entity_id=params['entity_id'])
+        try:
+            if params.get('date_from'):
+                # Aware bounds on the raw column, so the index is used
+                start, _ = day_range(
+                    datetime.date.fromisoformat(params['date_from']))
+                events = events.filter(created_at__gte=start)
+            if params.get('date_to'):
+                _, end = day_range(
+                    datetime.date.fromisoformat(params['date_to']))
+                events = events.filter(created_at__lt=end)
+            cursor = params.get('cursor', '')
+            if cursor:
+                created_at, _, event_id = cursor.rpartition('|')
+                created_at = datetime.datetime.fromisoformat(created_at)
+                events = events.filter(
+                    Q(created_at__lt=created_at) |
+                    Q(created_at=created_at, id__lt=int(event_id)))
+        except ValueError:
+            return redirect(request.path)
+
+        page = list(events.order_by('-created_at', '-id')[:self.page_size + 1])
+        next_url = None
+        if len(page) > self.page_size:
+            page = page[:self.page_size]
+            last = page[-1]
+            query = params.copy()
+            query['cursor'] = f'{last.created_at.isoformat()}|{last.id}'
+            next_url = f'?{query.urlencode()}'
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Audit log',
+            'events': page,
+            'event_types': AuditEvent.EVENT_TYPES,
+            'params': params,
+            'next_url': next_url,
+            'is_first_page': not cursor,
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request,
+                                'admin/store/auditevent/change_list.html',
+                                context)
+
+
 from django.contrib import admin
 
 # Register your models here.
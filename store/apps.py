@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class StoreConfig(AppConfig):
     name = 'store'
+
+    def ready(self):
+        # Connect the login / promotion / choices-cache receivers
+        from . import audit, choices, promotions  # noqa: F401
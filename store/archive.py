@@ -0,0 +1,104 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Sale, SaleItem, StockMovement, ArchivedSale, \
+    ArchivedSaleItem, ArchivedStockMovement
+
+SALE_FIELDS = ['id', 'customer_id', 'user_id', 'location_id',
+               'payment_method', 'total', 'promotion_discount', 'discount',
+               'discount_type', 'notes', 'status', 'cancelled_at',
+               'cancellation_reason', 'cancelled_by_id', 'created_at',
+               'day_close_id']
+SALE_ITEM_FIELDS = ['id', 'sale_id', 'product_id', 'quantity', 'price',
+                    'discount', 'promotion_id']
+MOVEMENT_FIELDS = ['id', 'product_id', 'location_id', 'movement_type',
+                   'quantity', 'reason', 'user_id', 'created_at']
+
+
+def archive_cutoff(months, today=None):
+    # Start of the month `months` months ago: only whole, closed months move
+    today = today or timezone.localdate()
+    month_index = today.year * 12 + today.month - 1 - months
+    first_day = datetime.date(month_index // 12, month_index % 12 + 1, 1)
+    return timezone.make_aware(
+        datetime.datetime.combine(first_day, datetime.time.min))
+
+
+# MOVING DATA
+# Each batch is its own short transaction on the oldest rows, so tills
+# writing today's sales never wait on the archiver.
+def archive_sales_batch(cutoff, batch_size=1000):
+    with transaction.atomic():
+        ids = list(
+            Sale.objects.filter(created_at__lt=cutoff)
+            .order_by('created_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+
+        ArchivedSale.objects.bulk_create([
+            ArchivedSale(**row)
+            for row in Sale.objects.filter(id__in=ids).values(*SALE_FIELDS)
+        ])
+        ArchivedSaleItem.objects.bulk_create([
+            ArchivedSaleItem(**row)
+            for row in SaleItem.objects.filter(sale_id__in=ids)
+            .values(*SALE_ITEM_FIELDS)
+        ], batch_size=5000)
+
+        SaleItem.objects.filter(sale_id__in=ids).delete()
+        Sale.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def archive_movements_batch(cutoff, batch_size=1000):
+    with transaction.atomic():
+        ids = list(
+            StockMovement.objects.filter(created_at__lt=cutoff)
+            .order_by('created_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+
+        ArchivedStockMovement.objects.bulk_create([
+            ArchivedStockMovement(**row)
+            for row in StockMovement.objects.filter(id__in=ids)
+            .values(*MOVEMENT_FIELDS)
+        ])
+        StockMovement.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+# UNIFIED READS
+# Archived rows are all older than the live ones (only whole months before
+# the cutoff move), so a newest-first page reads the archive only once the
+# live rows run out, and a list filtered on dates after the newest archived
+# row skips it entirely.
+def reaches_archive(archived_model, date_from=''):
+    # Can a list starting at `date_from` ('YYYY-MM-DD', or empty for "from
+    # the beginning") include archived rows? One read on the created_at index
+    newest = archived_model.objects.aggregate(
+        newest=Max('created_at'))['newest']
+    if newest is None:
+        return False
+    try:
+        start = parse_date(date_from) if date_from else None
+    except ValueError:
+        start = None
+    return start is None or start <= timezone.localdate(newest)
+
+
+def history_rows(to_rows, hot, archived, limit):
+    """
+    The newest `limit` rows of a live queryset continued by the same
+    filter on its archive table (None when it can't reach the archive),
+    each part formatted by to_rows().
+    """
+    rows = to_rows(hot.order_by('-created_at')[:limit])
+    if archived is not None and len(rows) < limit:
+        rows += to_rows(archived.order_by('-created_at')[:limit - len(rows)])
+    return rows
@@ -0,0 +1,78 @@
+import atexit
+import threading
+
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db import connection, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import AuditEvent
+
+_local = threading.local()
+
+
+def _buffer():
+    if not hasattr(_local, 'events'):
+        _local.events = []
+    return _local.events
+
+
+def _queue(event):
+    events = _buffer()
+    events.append(event)
+    if len(events) >= settings.AUDIT_BATCH_SIZE:
+        flush()
+
+
+def record(event_type, entity=None, user=None, **data):
+    """
+    Log an audit event. Nothing is written here: events are buffered per
+    thread and inserted in one bulk INSERT by flush() (end of request,
+    AUDIT_BATCH_SIZE reached or process exit). Inside a transaction the
+    event is only queued once it commits, so rolled back work leaves no
+    trace in the log.
+    """
+    event = AuditEvent(
+        created_at=timezone.now(),
+        event_type=event_type,
+        entity_type=entity._meta.model_name if entity is not None else '',
+        entity_id=entity.pk if entity is not None else None,
+        user=user if user is not None and user.is_authenticated else None,
+        data=data,
+    )
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _queue(event))
+    else:
+        _queue(event)
+
+
+def flush():
+    events = _buffer()
+    if not events:
+        return 0
+    _local.events = []
+    AuditEvent.objects.bulk_create(events)
+    return len(events)
+
+
+atexit.register(flush)  # management commands / scripts
+
+
+class AuditMiddleware:
+    """Write the events buffered during the request in one INSERT."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            flush()
+
+
+@receiver(user_logged_in)
+def log_login(sender, request, user, **kwargs):
+    record('login', user, user,
+           ip=request.META.get('REMOTE_ADDR', '') if request else '')
@@ -0,0 +1,125 @@
+import hashlib
+import time
+
+from django import forms
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.forms.models import ModelChoiceIterator
+
+from .models import Category, Location
+
+# Bounds how long a worker with a process-local cache can show a stale list
+CACHE_SECONDS = 300
+AUTOCOMPLETE_PAGE_SIZE = 20
+
+# Models whose full list still ends up in <select>s (small tables)
+CACHED_MODELS = (Category, Location)
+
+
+# VERSIONED CACHE
+def _version_key(model):
+    return f'choices:{model._meta.label_lower}:version'
+
+
+def choices_version(model):
+    return cache.get_or_set(_version_key(model), time.time_ns, None)
+
+
+def invalidate_choices(sender, **kwargs):
+    # A new version makes every cached list of the model unreachable
+    cache.set(_version_key(sender), time.time_ns(), None)
+
+
+for _model in CACHED_MODELS:
+    post_save.connect(invalidate_choices, sender=_model)
+    post_delete.connect(invalidate_choices, sender=_model)
+
+
+def cached_choices(queryset):
+    """
+    [(pk, label)] for a queryset, cached under the model's current version
+    (one query per version and worker instead of one per form render).
+    """
+    model = queryset.model
+    query = hashlib.md5(str(queryset.query).encode()).hexdigest()
+    key = f'choices:{model._meta.label_lower}:{choices_version(model)}:{query}'
+    choices = cache.get(key)
+    if choices is None:
+        choices = [(obj.pk, str(obj)) for obj in queryset]
+        cache.set(key, choices, CACHE_SECONDS)
+    return choices
+
+
+class CachedChoiceIterator(ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from cached_choices(self.queryset)
+
+    def __len__(self):
+        return (len(cached_choices(self.queryset)) +
+                (self.field.empty_label is not None))
+
+    def __bool__(self):
+        return self.field.empty_label is not None or \
+            bool(cached_choices(self.queryset))
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    # Options come from cached_choices(); the submitted value is still
+    # validated against the queryset with one pk lookup
+    iterator = CachedChoiceIterator
+
+
+# AUTOCOMPLETE
+class AutocompleteWidget(forms.Widget):
+    """
+    Hidden input holding the pk plus a search box that queries a JSON
+    endpoint (store/js/autocomplete.js). Only the selected object is read
+    to show its label; no options are rendered.
+    """
+    template_name = 'store/widgets/autocomplete.html'
+
+    def __init__(self, url, queryset=None, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+        self.queryset = queryset
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        label = ''
+        if value not in (None, '') and self.queryset is not None:
+            obj = self.queryset.filter(pk=value).first() \
+                if str(value).isdigit() else None
+            label = str(obj) if obj else ''
+        context['widget'].update(url=self.url, label=label)
+        return context
+
+
+class AutocompleteField(forms.ModelChoiceField):
+    # ModelChoiceField.to_python already does a single queryset.get(pk=...)
+    def __init__(self, queryset, url, placeholder='Pesquisar...', **kwargs):
+        kwargs.setdefault('widget', AutocompleteWidget(
+            url, attrs={'class': 'form-control', 'placeholder': placeholder}))
+        super().__init__(queryset, **kwargs)
+
+    def _set_queryset(self, queryset):
+        # No <option>s to build; the widget only needs it for the label
+        self._queryset = None if queryset is None else queryset.all()
+        self.widget.queryset = self._queryset
+
+    queryset = property(forms.ModelChoiceField._get_queryset, _set_queryset)
+
+
+def autocomplete_page(queryset, page, to_json):
+    # {'results': [...], 'more': bool}; reads one row past the page
+    try:
+        page = max(int(page), 1)
+    except (TypeError, ValueError):
+        page = 1
+    start = (page - 1) * AUTOCOMPLETE_PAGE_SIZE
+    rows = list(queryset[start:start + AUTOCOMPLETE_PAGE_SIZE + 1])
+    return {
+        'results': [to_json(row) for row in rows[:AUTOCOMPLETE_PAGE_SIZE]],
+        'more': len(rows) > AUTOCOMPLETE_PAGE_SIZE,
+    }
@@ -0,0 +1,133 @@
+import datetime
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, Q, Sum
+from django.utils import timezone
+
+from .models import DayClose, Sale
+from .services import final_total_expression, items_sum, MONEY
+from .stock import default_location
+from . import audit
+
+ZERO = Decimal('0')
+CENTS = Decimal('0.01')
+COMPLETED = Q(status='completed')
+CANCELLED = Q(status='cancelled')
+TOTALS = ['sale_count', 'item_count', 'gross_total', 'promotion_discount',
+          'discount', 'total', 'cost_total', 'cancelled_count',
+          'cancelled_total']
+
+
+def day_range(day):
+    # [start, end) of a local calendar day, as aware datetimes
+    start = timezone.make_aware(datetime.datetime.combine(day,
+                                                          datetime.time()))
+    return start, start + datetime.timedelta(days=1)
+
+
+def day_totals(sales):
+    """
+    Z-report totals of `sales` per user and payment method, in one grouped
+    query: [{'user_id', 'username', 'payment_method', <TOTALS>}].
+    """
+    final_total = final_total_expression()
+    rows = (
+        sales.annotate(
+            unit_count=items_sum(F('quantity'), IntegerField()),
+            unit_cost=items_sum(F('quantity') * F('product__cost'), MONEY),
+        )
+        .values('user_id', 'user__username', 'payment_method')
+        .annotate(
+            # z_ prefix: the names must not shadow Sale.total / discount
+            z_sale_count=Count('id', filter=COMPLETED),
+            z_item_count=Sum('unit_count', filter=COMPLETED),
+            z_gross_total=Sum(F('total') + F('promotion_discount'),
+                              filter=COMPLETED, output_field=MONEY),
+            z_promotion_discount=Sum('promotion_discount', filter=COMPLETED),
+            z_discount=Sum(F('total') - final_total, filter=COMPLETED,
+                           output_field=MONEY),
+            z_total=Sum(final_total, filter=COMPLETED),
+            z_cost_total=Sum('unit_cost', filter=COMPLETED,
+                             output_field=MONEY),
+            z_cancelled_count=Count('id', filter=CANCELLED),
+            z_cancelled_total=Sum(final_total, filter=CANCELLED),
+        )
+        .order_by('user__username', 'payment_method')
+    )
+    methods = dict(Sale.PAYMENT_METHODS)
+    lines = []
+    for row in rows:
+        line = {}
+        for key in TOTALS:
+            value = row[f'z_{key}'] or 0
+            if isinstance(value, Decimal):
+                value = value.quantize(CENTS)
+            line[key] = value
+        line.update(user_id=row['user_id'],
+                    username=row['user__username'] or '-',
+                    payment_method=row['payment_method'],
+                    payment_method_display=methods.get(
+                        row['payment_method'], row['payment_method']))
+        lines.append(line)
+    return lines
+
+
+def close_day(day, location, user=None, force=False):
+    """
+    Close `day` at `location`: the day's sales are tagged with a new
+    DayClose and their totals frozen on it. Raises ValueError if the day
+    is already closed, has not started yet, or has not ended yet (unless
+    `force`: sales made later that day then stay out of the report).
+    """
+    start, end = day_range(day)
+    now = timezone.now()
+    if start > now:
+        raise ValueError('Não é possível fechar um dia futuro.')
+    if end > now and not force:
+        raise ValueError(f'O dia {day:%d/%m/%Y} ainda não terminou: vendas '
+                         f'feitas depois do fechamento ficariam fora da '
+                         f'Redução Z. Marque "Fechar antes do fim do dia" '
+                         f'para fechar mesmo assim.')
+
+    try:
+        with transaction.atomic():
+            close = DayClose.objects.create(day=day, location=location,
+                                            closed_by=user)
+            # Tag first, then total exactly the tagged rows: a sale saved
+            # while closing is either in the report or left open
+            sales = Sale.objects.filter(created_at__gte=start,
+                                        created_at__lt=end,
+                                        day_close__isnull=True)
+            here = Q(location=location)
+            if location == default_location():
+                # Sales without a location belong to the default one
+                here |= Q(location__isnull=True)
+            sales.filter(here).update(day_close=close)
+            close.lines = day_totals(Sale.objects.filter(day_close=close))
+            for key in TOTALS:
+                setattr(close, key, sum(line[key] for line in close.lines))
+            close.save()
+            audit.record('day_closed', close, user, day=day,
+                         location=location.code, total=close.total,
+                         sales=close.sale_count, early=end > now)
+    except IntegrityError:
+        raise ValueError(f'O dia {day:%d/%m/%Y} já foi fechado em '
+                         f'{location}.')
+    return close
+
+
+def closed_summary(date_from=None, date_to=None):
+    # Frozen totals of the closed days in the range (one aggregate query)
+    closes = DayClose.objects.all()
+    if date_from:
+        closes = closes.filter(day__gte=date_from)
+    if date_to:
+        closes = closes.filter(day__lte=date_to)
+    row = closes.aggregate(total=Sum('total'), cost=Sum('cost_total'),
+                           sales=Sum('sale_count'))
+    return {
+        'total': row['total'] or ZERO,
+        'profit': (row['total'] or ZERO) - (row['cost'] or ZERO),
+        'sales': row['sales'] or 0,
+    }
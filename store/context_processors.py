@@ -0,0 +1,16 @@
+from django.utils.functional import SimpleLazyObject
+
+from .choices import cached_choices
+from .models import Location
+from .stock import current_location
+
+
+def locations(request):
+    # Sidebar location selector: [(id, name)] from the versioned choices
+    # cache, read only if a template uses it
+    return {
+        'locations': SimpleLazyObject(
+            lambda: cached_choices(Location.objects.filter(active=True))),
+        'current_location': SimpleLazyObject(
+            lambda: current_location(request)),
+    }
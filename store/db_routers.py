@@ -0,0 +1,92 @@
+import contextvars
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+REPLICA = 'replica'
+PIN_COOKIE = 'pin_primary'
+
+# Alias used for reads in the current request; None means "default"
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+_replica_state = {'checked_at': None, 'healthy': False}
+
+
+def replica_lag():
+    # Seconds the replica is behind the primary (0 when it is not a standby,
+    # e.g. the SQLite copy used in tests), infinity when it can't be reached
+    connection = connections[REPLICA]
+    try:
+        if connection.vendor != 'postgresql':
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT CASE WHEN pg_is_in_recovery() THEN COALESCE('
+                'EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()),'
+                ' 0) ELSE 0 END')
+            return float(cursor.fetchone()[0])
+    except DatabaseError:
+        return float('inf')
+
+
+def replica_available():
+    # Lag is checked at most every REPLICA_LAG_CHECK_INTERVAL seconds
+    if REPLICA not in settings.DATABASES:
+        return False
+    now = time.monotonic()
+    checked_at = _replica_state['checked_at']
+    if checked_at is None or now - checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+        _replica_state['healthy'] = replica_lag() <= settings.REPLICA_MAX_LAG
+        _replica_state['checked_at'] = now
+    return _replica_state['healthy']
+
+
+def read_from_replica(view):
+    # For read-only report / list views. Falls back to the primary when no
+    # replica is configured, it lags too much, or the user just wrote
+    # something (pin cookie set by ReplicaPinningMiddleware).
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (request.method not in ('GET', 'HEAD') or
+                PIN_COOKIE in request.COOKIES or not replica_available()):
+            return view(request, *args, **kwargs)
+        token = _read_alias.set(REPLICA)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaPinningMiddleware:
+    """
+    After any write request, pin the client's reads to the primary for
+    REPLICA_PIN_SECONDS so read-after-write pages (the sale detail after
+    checkout, lists after an edit) never show replica lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response.set_cookie(PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,65 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .models import Category, Product, Customer, Sale, SaleItem
+
+
+def seed_demo_data(products=200, customers=500, sales=2000, items_per_sale=3,
+                   days=365, seed=42):
+    # Bulk-inserts a synthetic catalog and sales history for profiling and
+    # benchmarks. Callers usually run it inside a rolled back transaction.
+    rng = random.Random(seed)
+    now = timezone.now()
+    user, _ = User.objects.get_or_create(username='demo-data')
+
+    categories = Category.objects.bulk_create(
+        [Category(name=f'Demo category {i}') for i in range(10)])
+
+    catalog = Product.objects.bulk_create([
+        Product(
+            name=f'Demo product {i}',
+            category=rng.choice(categories),
+            price=Decimal(rng.randint(100, 20000)) / 100,
+            cost=Decimal(rng.randint(50, 10000)) / 100,
+            stock=rng.randint(0, 500),
+        )
+        for i in range(products)
+    ], batch_size=1000)
+
+    buyers = Customer.objects.bulk_create([
+        Customer(name=f'Demo customer {i}', phone=f'9498{i:07d}')
+        for i in range(customers)
+    ], batch_size=1000)
+
+    payment_methods = [value for value, _ in Sale.PAYMENT_METHODS]
+    sale_rows = Sale.objects.bulk_create([
+        Sale(
+            user=user,
+            customer=rng.choice(buyers) if buyers and rng.random() < 0.6
+            else None,
+            payment_method=rng.choice(payment_methods),
+            discount=Decimal(rng.choice([0, 0, 0, 5, 10])),
+            discount_type=rng.choice(['value', 'percent']),
+            created_at=now - timedelta(seconds=rng.randint(0, days * 86400)),
+        )
+        for _ in range(sales)
+    ], batch_size=1000)
+
+    items = []
+    for sale in sale_rows:
+        total = Decimal(0)
+        for product in rng.sample(catalog, min(items_per_sale, len(catalog))):
+            quantity = rng.randint(1, 5)
+            items.append(SaleItem(sale=sale, product=product,
+                                  quantity=quantity, price=product.price))
+            total += product.price * quantity
+        sale.total = total
+    SaleItem.objects.bulk_create(items, batch_size=5000)
+    Sale.objects.bulk_update(sale_rows, ['total'], batch_size=1000)
+
+    return {'products': len(catalog), 'customers': len(buyers),
+            'sales': len(sale_rows), 'items': len(items)}
@@ -1,15 +1,40 @@
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
 from django import forms
-from .models import Product, Category, Customer, Sale, StockMovement
+from django.db.models import F, Q
+from django.urls import reverse_lazy
+from .models import Product, Category, Customer, Sale, StockMovement, \
+    Location, LocationStock, Supplier
+from .choices import AutocompleteField, CachedModelChoiceField
+
+
+def product_field():
+    # Searched as you type instead of a <select> of the whole catalog
+    return AutocompleteField(Product.objects.filter(active=True),
+                             reverse_lazy('product_autocomplete'),
+                             placeholder='Nome ou código de barras')
+
+
+def location_field():
+    return CachedModelChoiceField(
+        queryset=Location.objects.filter(active=True),
+        widget=forms.Select(attrs={'class': 'form-select'}))
 
 
 class ProductForm(forms.ModelForm):
+    category = CachedModelChoiceField(
+        queryset=Category.objects.all(),
+        widget=forms.Select(attrs={'class': 'form-select'}))
+    # Product.version the edit started from (see Product.save_fields)
+    version = forms.IntegerField(widget=forms.HiddenInput, required=False)
+
     class Meta:
         model = Product
         fields = ['name', 'category', 'description', 'price', 'cost', 'stock',
                   'min_stock', 'barcode', 'image', 'active']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
-            'category': forms.Select(attrs={'class': 'form-select'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'price': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
             'cost': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
@@ -20,6 +45,16 @@ class ProductForm(forms.ModelForm):
             'active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['version'].initial = self.instance.version
+            self.fields['version'].required = True
+            # Stock lives per location: change it with stock movements
+            self.fields['stock'].disabled = True
+            self.fields['stock'].help_text = (
+                'Total em todas as lojas. Use o ajuste de estoque para alterar.')
+
 
 class CategoryForm(forms.ModelForm):
     class Meta:
@@ -45,11 +80,15 @@ class CustomerForm(forms.ModelForm):
 
 
 class SaleForm(forms.ModelForm):
+    customer = AutocompleteField(Customer.objects.all(),
+                                 reverse_lazy('customer_autocomplete'),
+                                 placeholder='Nome, CPF ou telefone',
+                                 required=False)
+
     class Meta:
         model = Sale
         fields = ['customer', 'payment_method', 'discount', 'notes']
         widgets = {
-            'customer': forms.Select(attrs={'class': 'form-select'}),
             'payment_method': forms.Select(attrs={'class': 'form-select'}),
             'discount': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
@@ -57,12 +96,225 @@ class SaleForm(forms.ModelForm):
 
 
 class StockMovementForm(forms.ModelForm):
+    location = location_field()
+    product = product_field()
+
     class Meta:
         model = StockMovement
-        fields = ['product', 'movement_type', 'quantity', 'reason']
+        fields = ['location', 'product', 'movement_type', 'quantity', 'reason']
         widgets = {
-            'product': forms.Select(attrs={'class': 'form-select'}),
             'movement_type': forms.Select(attrs={'class': 'form-select'}),
             'quantity': forms.NumberInput(attrs={'class': 'form-control'}),
             'reason': forms.TextInput(attrs={'class': 'form-control'}),
-        }
\ No newline at end of file
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Transfers have their own form
+        self.fields['movement_type'].choices = [
+            choice for choice in self.fields['movement_type'].choices
+            if not choice[0].startswith('transfer')
+        ]
+
+
+class StockTransferForm(forms.Form):
+    product = product_field()
+    source = location_field()
+    destination = location_field()
+    quantity = forms.IntegerField(
+        min_value=1, widget=forms.NumberInput(attrs={'class': 'form-control'}))
+    reason = forms.CharField(
+        max_length=200, widget=forms.TextInput(attrs={'class': 'form-control'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        source = cleaned_data.get('source')
+        destination = cleaned_data.get('destination')
+        product = cleaned_data.get('product')
+        quantity = cleaned_data.get('quantity')
+
+        if source and destination and source == destination:
+            raise forms.ValidationError(
+                'A loja de origem e de destino devem ser diferentes.')
+        if source and product and quantity:
+            available = LocationStock.objects.filter(
+                location=source, product=product
+            ).values_list('quantity', flat=True).first() or 0
+            if available < quantity:
+                raise forms.ValidationError(
+                    f'Estoque insuficiente em {source}: {available} disponível.')
+        return cleaned_data
+
+
+class RepriceForm(forms.Form):
+    FIELDS = [('price', 'Preço de venda'), ('cost', 'Custo')]
+
+    category = CachedModelChoiceField(
+        queryset=Category.objects.all(), required=False,
+        empty_label='Todos os produtos ativos',
+        widget=forms.Select(attrs={'class': 'form-select'}))
+    field = forms.ChoiceField(
+        choices=FIELDS, widget=forms.Select(attrs={'class': 'form-select'}))
+    percent = forms.DecimalField(
+        required=False, max_digits=6, decimal_places=2,
+        widget=forms.NumberInput(attrs={'class': 'form-control',
+                                        'step': '0.01'}))
+    amount = forms.DecimalField(
+        required=False, max_digits=10, decimal_places=2,
+        widget=forms.NumberInput(attrs={'class': 'form-control',
+                                        'step': '0.01'}))
+    effective_from = forms.DateTimeField(
+        required=False,
+        widget=forms.DateTimeInput(attrs={'class': 'form-control',
+                                          'type': 'datetime-local'}))
+    reason = forms.CharField(
+        max_length=200, widget=forms.TextInput(attrs={'class': 'form-control'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('percent') is None and \
+                cleaned_data.get('amount') is None:
+            raise forms.ValidationError(
+                'Informe uma percentagem e/ou um valor de ajuste.')
+        return cleaned_data
+
+
+class DayCloseForm(forms.Form):
+    day = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'form-control',
+                                      'type': 'date'}))
+    force = forms.BooleanField(
+        required=False, label='Fechar antes do fim do dia',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}))
+
+
+# PURCHASING
+LINE_SEPARATOR = re.compile(r'[;\t]')
+
+
+def _money(value):
+    # "12.50" or "12,50", to the cent; None if it is not a number
+    try:
+        value = Decimal(value.strip().replace(',', '.'))
+        if not value.is_finite():  # "nan", "inf"
+            return None
+        return value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        return None
+
+
+class PurchaseOrderForm(forms.Form):
+    supplier = CachedModelChoiceField(
+        queryset=Supplier.objects.filter(active=True),
+        widget=forms.Select(attrs={'class': 'form-select'}))
+    location = location_field()
+    lines = forms.CharField(
+        help_text='Uma linha por produto: código de barras (ou ID); '
+                  'quantidade; custo unitário (opcional, usa o custo atual). '
+                  'Colunas copiadas de uma planilha também servem.',
+        widget=forms.Textarea(attrs={'class': 'form-control font-monospace',
+                                     'rows': 12,
+                                     'placeholder': '7891234567890; 24; 3,50'}))
+    notes = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 2}))
+
+    def clean_lines(self):
+        # [(product, quantity, unit_cost)]: every product in one query
+        rows = []
+        for number, line in enumerate(self.cleaned_data['lines'].splitlines(),
+                                      1):
+            if not line.strip():
+                continue
+            fields = [field.strip() for field in LINE_SEPARATOR.split(line)]
+            if len(fields) < 2 or not fields[1].isdigit() or \
+                    not int(fields[1]):
+                raise forms.ValidationError(
+                    f'Linha {number}: informe código; quantidade.')
+            cost = _money(fields[2]) if len(fields) > 2 and fields[2] \
+                else None
+            if len(fields) > 2 and fields[2] and (cost is None or cost < 0):
+                raise forms.ValidationError(
+                    f'Linha {number}: custo inválido "{fields[2]}".')
+            rows.append((number, fields[0], int(fields[1]), cost))
+        if not rows:
+            raise forms.ValidationError('Informe pelo menos um produto.')
+
+        codes = {code for _, code, _, _ in rows}
+        ids = [int(code) for code in codes if code.isdigit()]
+        found = Product.objects.filter(Q(barcode__in=codes) | Q(pk__in=ids))
+        by_barcode = {product.barcode: product for product in found
+                      if product.barcode}
+        by_id = {str(product.pk): product for product in found}
+
+        lines, seen = [], set()
+        for number, code, quantity, cost in rows:
+            # A barcode wins over an ID with the same digits
+            product = by_barcode.get(code) or by_id.get(code)
+            if product is None:
+                raise forms.ValidationError(
+                    f'Linha {number}: produto "{code}" não encontrado.')
+            if product.pk in seen:
+                raise forms.ValidationError(
+                    f'Linha {number}: "{product.name}" repetido.')
+            seen.add(product.pk)
+            lines.append((product, quantity,
+                          product.cost if cost is None else cost))
+        return lines
+
+
+class GoodsReceiptForm(forms.Form):
+    """
+    Receipt of the open lines of an order. Each line posts quantity_<id>
+    and cost_<id> (plain inputs: a 300-line order renders no widgets).
+    """
+    invoice_number = forms.CharField(
+        required=False, max_length=50,
+        widget=forms.TextInput(attrs={'class': 'form-control'}))
+    notes = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 2}))
+
+    def __init__(self, order, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.order = order
+        self.items = list(order.items.filter(
+            received_quantity__lt=F('quantity')).select_related(
+            'product').order_by('product__name'))
+
+    def rows(self):
+        # (item, quantity, cost) as typed, or the remaining quantity and
+        # the ordered cost on a new form
+        for item in self.items:
+            if self.is_bound:
+                yield (item, self.data.get(f'quantity_{item.pk}', ''),
+                       self.data.get(f'cost_{item.pk}', ''))
+            else:
+                yield item, item.remaining, item.unit_cost
+
+    def clean(self):
+        cleaned_data = super().clean()
+        lines, errors = {}, []
+        for item, quantity, cost in self.rows():
+            quantity = (quantity or '0').strip()
+            if not quantity.isdigit():
+                errors.append(f'{item.product.name}: quantidade inválida.')
+                continue
+            quantity = int(quantity)
+            if not quantity:
+                continue
+            if quantity > item.remaining:
+                errors.append(f'{item.product.name}: só faltam '
+                              f'{item.remaining}.')
+            cost = _money(cost) if cost else item.unit_cost
+            if cost is None or cost < 0:
+                errors.append(f'{item.product.name}: custo inválido.')
+                continue
+            lines[item.pk] = (quantity, cost)
+        if not lines and not errors:
+            errors.append('Informe a quantidade recebida de pelo menos um '
+                          'item.')
+        if errors:
+            raise forms.ValidationError(errors)
+        cleaned_data['lines'] = lines
+        return cleaned_data
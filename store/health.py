@@ -0,0 +1,76 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .metrics import in_flight
+
+logger = logging.getLogger(__name__)
+
+HEALTH_KEY = 'health:ping'
+
+# Set once every migration is applied: they can't be unapplied under us
+_migrated = {'done': False}
+
+
+def check_database():
+    try:
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError:
+        # The endpoints are public: details go to the log, not the response
+        logger.exception('Health check: database unreachable')
+        return 'error'
+    return 'ok'
+
+
+def check_cache():
+    try:
+        cache.set(HEALTH_KEY, 1, 10)
+        if cache.get(HEALTH_KEY) != 1:
+            return 'error: value not read back'
+    except Exception:  # any backend (Redis, memcached...)
+        logger.exception('Health check: cache unreachable')
+        return 'error'
+    return 'ok'
+
+
+def check_migrations():
+    if _migrated['done']:
+        return 'ok'
+    from django.db.migrations.executor import MigrationExecutor
+
+    try:
+        executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+        pending = executor.migration_plan(
+            executor.loader.graph.leaf_nodes())
+    except DatabaseError:
+        logger.exception('Health check: migrations not readable')
+        return 'error'
+    if pending:
+        return f'error: {len(pending)} migrations not applied'
+    _migrated['done'] = True
+    return 'ok'
+
+
+def check_capacity():
+    # Saturated when every web thread is busy (this request included)
+    busy = in_flight()
+    if busy >= settings.WEB_THREADS:
+        return f'error: {busy} of {settings.WEB_THREADS} threads busy'
+    return 'ok'
+
+
+def health():
+    # Liveness: the process can reach its database and cache
+    return {'database': check_database(), 'cache': check_cache()}
+
+
+def readiness():
+    # Ready to take traffic: healthy, migrated and not saturated
+    checks = health()
+    checks['migrations'] = check_migrations()
+    checks['capacity'] = check_capacity()
+    return checks
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from store.pricing import apply_due_prices
+
+
+class Command(BaseCommand):
+    help = ('Copy scheduled price changes that are now effective onto the '
+            'products. Run it every few minutes (cron / Task Scheduler).')
+
+    requires_system_checks = []
+
+    def handle(self, *args, **options):
+        updated = apply_due_prices()
+        self.stdout.write(self.style.SUCCESS(
+            f'Prices updated for {updated} products.'))
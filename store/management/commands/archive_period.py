@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.archive import archive_cutoff, archive_sales_batch, \
+    archive_movements_batch
+from store.models import Sale, StockMovement
+
+
+class Command(BaseCommand):
+    help = ('Move sales, sale items and stock movements older than the given '
+            'number of months into the archive tables, in small batches')
+
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=24)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help='Seconds to sleep between batches')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['months'])
+        self.stdout.write(f'Archiving everything before {cutoff:%Y-%m-%d}')
+
+        if options['dry_run']:
+            sales = Sale.objects.filter(created_at__lt=cutoff).count()
+            movements = StockMovement.objects.filter(
+                created_at__lt=cutoff).count()
+            self.stdout.write(
+                f'{sales} sales and {movements} stock movements would move.')
+            return
+
+        for label, archive_batch in (('sales', archive_sales_batch),
+                                     ('stock movements',
+                                      archive_movements_batch)):
+            moved = 0
+            while True:
+                count = archive_batch(cutoff, options['batch_size'])
+                if not count:
+                    break
+                moved += count
+                self.stdout.write(f'  {moved} {label} archived...')
+                time.sleep(options['pause'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{moved} {label} archived.'))
@@ -0,0 +1,138 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template import Engine, RequestContext, engines
+from django.test import RequestFactory
+
+from store.demo_data import seed_demo_data
+from store.models import Customer, Sale, StockMovement, Product
+from store.rows import sale_rows, customer_rows, movement_rows
+from store.stock import default_location
+
+# The old list templates (instances mode) live outside the app's
+# templates, so they never ship as loadable pages
+BENCHMARK_TEMPLATES = settings.BASE_DIR / 'benchmarks' / 'templates'
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def _lists(rows):
+    # (template, context name, row builder) of each list page: the way the
+    # views build them now (dicts from store/rows.py), and the way they did
+    # before, with lazy querysets of model instances rendered by the old
+    # templates (the queries then run while rendering)
+    return [
+        ('store/sale_list.html', 'sales', {
+            'rows': lambda: sale_rows(
+                Sale.objects.filter(status='completed')[:rows]),
+            'instances': lambda: Sale.objects.filter(
+                status='completed')[:rows],
+        }),
+        ('store/customer_list.html', 'customers', {
+            'rows': lambda: customer_rows(
+                Customer.objects.order_by('name')[:rows]),
+            'instances': lambda: Customer.objects.select_related(
+                'stats').order_by('name')[:rows],
+        }),
+        ('store/stock_movements.html', 'movements', {
+            'rows': lambda: movement_rows(StockMovement.objects.all()[:rows]),
+            'instances': lambda: StockMovement.objects.select_related(
+                'product', 'location', 'user')[:rows],
+        }),
+    ]
+
+
+def _template(name, mode):
+    if mode == 'rows':
+        return name
+    return name.replace('store/', 'store/benchmark/').replace(
+        '.html', '_instances.html')
+
+
+def _timed(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+class Command(BaseCommand):
+    help = ('Render the sale, customer and stock movement lists with N rows '
+            'against seeded demo data (rolled back) and print the median '
+            'time to build the rows and to render them: with the current '
+            'template settings, without the cached loader and with the '
+            'production profile (cached loader, debug off). Each list is '
+            'rendered from store/rows.py dicts (rows) and, for comparison, '
+            'the way it was before them (instances).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        configured = engines['django'].engine
+
+        def engine(loaders, debug):
+            return Engine(
+                dirs=[*configured.dirs, BENCHMARK_TEMPLATES],
+                loaders=loaders, debug=debug,
+                context_processors=configured.context_processors,
+                libraries=configured.libraries, builtins=configured.builtins)
+
+        current = engine(configured.loaders, configured.debug)
+        uncached = engine(LOADERS, configured.debug)
+        production = engine([('django.template.loaders.cached.Loader',
+                              LOADERS)], False)
+
+        with transaction.atomic():
+            seed_demo_data(products=200, customers=rows, sales=rows,
+                           items_per_sale=3)
+            user = User.objects.create_superuser('benchmark-lists',
+                                                 password=None)
+            location = default_location()
+            StockMovement.objects.bulk_create([
+                StockMovement(product=product, location=location,
+                              movement_type='in', quantity=10, user=user,
+                              reason='Benchmark')
+                for product in Product.objects.all()[:rows]
+            ] * max(rows // 200, 1))
+
+            request = RequestFactory().get('/')
+            request.user = user
+            request.session = {}
+
+            self.stdout.write(f'{"Template":<30} {"mode":<10} {"build ms":>9} '
+                              f'{"render ms":>10} {"total":>8} '
+                              f'{"uncached":>9} {"production":>11}')
+            for name, key, modes in _lists(rows):
+                for mode, build in modes.items():
+                    template = _template(name, mode)
+
+                    def render(engine):
+                        # Instances are fetched again on every render, as
+                        # they were on every request
+                        data = build() if mode == 'instances' else rows_data
+                        engine.get_template(template).render(
+                            RequestContext(request, {key: data}))
+
+                    rows_data = build()
+                    build_ms = _timed(build, repeat) if mode == 'rows' else 0
+                    times = []
+                    for template_engine in (current, uncached, production):
+                        render(template_engine)  # warm the cached loaders
+                        times.append(_timed(lambda: render(template_engine),
+                                            repeat))
+                    self.stdout.write(
+                        f'{name:<30} {mode:<10} {build_ms:>9.1f} '
+                        f'{times[0]:>10.1f} {build_ms + times[0]:>8.1f} '
+                        f'{times[1]:>9.1f} {times[2]:>11.1f}')
+            transaction.set_rollback(True)
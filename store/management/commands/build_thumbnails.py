@@ -0,0 +1,42 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from store.models import Product
+from store.thumbnails import build_rendition
+
+
+class Command(BaseCommand):
+    help = 'Build product thumbnail renditions in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=os.cpu_count() or 2)
+        parser.add_argument('--all', action='store_true',
+                            help='Rebuild products that already have one')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            products = products.filter(thumbnail='')
+        rows = list(products.values_list('pk', 'image'))
+
+        # Pillow releases the GIL while decoding/resizing/encoding, so
+        # threads scale; database writes stay on the main thread
+        built, failed = [], 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [(pk, pool.submit(build_rendition, name))
+                       for pk, name in rows]
+            for pk, future in futures:
+                try:
+                    built.append(Product(pk=pk, thumbnail=future.result()))
+                except OSError as error:
+                    failed += 1
+                    self.stderr.write(f'Product #{pk}: {error}')
+
+        Product.objects.bulk_update(built, ['thumbnail'],
+                                    batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(built)} thumbnails built, {failed} failed.'))
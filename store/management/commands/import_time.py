@@ -0,0 +1,94 @@
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def parse_importtime(output):
+    # [(self us, cumulative us, depth, module)] from `python -X importtime`
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # column header
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        entries.append((int(fields[0]), int(fields[1]),
+                        (len(name) - len(module) - 1) // 2, module))
+    return entries
+
+
+class Command(BaseCommand):
+    help = ('Run a manage.py command under `python -X importtime` and '
+            'report where its startup time goes: total import time, the '
+            'packages with the most self time and the slowest top-level '
+            'imports. With --budget, fails when imports take longer.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', nargs='*', default=['check'],
+                            help="Command to measure, e.g. 'reorder_points' "
+                                 "(default: check). Put its own options "
+                                 "after --")
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs to take the median of')
+        parser.add_argument('--budget', type=float,
+                            help='Maximum import time in ms')
+
+    def handle(self, *args, **options):
+        target, top = options['target'], options['top']
+        runs = sorted((self.measure(target)
+                       for _ in range(max(options['repeat'], 1))),
+                      key=lambda run: run[0])
+        # The median run (single runs vary with the disk cache)
+        total, wall, entries = runs[len(runs) // 2]
+        packages = defaultdict(int)
+        for own, _, _, module in entries:
+            packages[module.split('.')[0]] += own
+
+        self.stdout.write(f'manage.py {" ".join(target)}: {wall:.0f} ms '
+                          f'wall, {total:.1f} ms importing {len(entries)} '
+                          f'modules\n')
+        self.stdout.write(f'{"Package (self time)":<40} {"ms":>8}')
+        for package, own in sorted(packages.items(),
+                                   key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'{package:<40} {own / 1000:>8.1f}')
+
+        self.stdout.write(f'\n{"Top-level import (cumulative)":<40} '
+                          f'{"ms":>8}')
+        roots = sorted((entry for entry in entries if entry[2] == 0),
+                       key=lambda entry: -entry[1])[:top]
+        for _, cumulative, _, module in roots:
+            self.stdout.write(f'{module:<40} {cumulative / 1000:>8.1f}')
+
+        budget = options['budget']
+        if budget is not None:
+            if total > budget:
+                raise CommandError(f'Import time {total:.1f} ms is over the '
+                                   f'{budget:.0f} ms budget.')
+            self.stdout.write(self.style.SUCCESS(
+                f'\nWithin the {budget:.0f} ms budget.'))
+
+    def measure(self, target):
+        # (import ms, wall ms, entries) of one run of the command
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime',
+             str(settings.BASE_DIR / 'manage.py'), *target],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        wall = (time.perf_counter() - started) * 1000
+
+        entries = parse_importtime(result.stderr)
+        if result.returncode or not entries:
+            errors = [line for line in result.stderr.splitlines()
+                      if not line.startswith('import time:')]
+            raise CommandError(f'"{" ".join(target)}" failed:\n' +
+                               '\n'.join(errors[-10:]))
+        total = sum(cumulative for _, cumulative, depth, _ in entries
+                    if depth == 0) / 1000
+        return total, wall, entries
@@ -0,0 +1,132 @@
+import http.cookiejar
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.models import Location, LocationStock
+from store.stock import default_location
+
+
+class Session:
+    # Minimal logged-in HTTP client (one per worker thread)
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def request(self, path, data=None):
+        body = None
+        headers = {'Referer': self.base_url + path}
+        if data is not None:
+            data = list(data) + [('csrfmiddlewaretoken', self.csrf_token())]
+            body = urllib.parse.urlencode(data).encode()
+        request = urllib.request.Request(self.base_url + path, body, headers)
+        with self.opener.open(request, timeout=60) as response:
+            return response.status, response.read().decode()
+
+    def login(self, username, password):
+        self.request('/admin/login/')  # sets the csrftoken cookie
+        self.request('/admin/login/?next=/', [('username', username),
+                                             ('password', password)])
+        with self.opener.open(self.base_url + '/', timeout=60) as response:
+            if '/admin/login/' in response.geturl():
+                raise CommandError('Login failed')
+
+
+class Command(BaseCommand):
+    help = ('Load test a running server (Waitress or Gunicorn): concurrent '
+            'dashboard reads and/or checkouts, reporting throughput and '
+            'latency percentiles. Checkouts create real sales.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--scenario', choices=['dashboard', 'checkout'],
+                            default='dashboard')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--location',
+                            help='Location code the checkouts sell from '
+                                 '(default: the default location)')
+
+    def handle(self, *args, **options):
+        if options['location']:
+            location = Location.objects.filter(
+                code=options['location'], active=True).first()
+            if location is None:
+                raise CommandError(
+                    f'Unknown location "{options["location"]}"')
+        else:
+            location = default_location()
+
+        if options['scenario'] == 'checkout':
+            # sale_create checks the stock at the session's location, not
+            # the product total
+            product_ids = list(LocationStock.objects.filter(
+                location=location, product__active=True,
+                quantity__gte=options['requests']
+            ).values_list('product_id', flat=True)[:20])
+            if not product_ids:
+                raise CommandError(
+                    f'Checkout needs products with stock >= --requests at '
+                    f'{location}')
+        else:
+            product_ids = []
+
+        local = threading.local()
+
+        def session():
+            if not hasattr(local, 'session'):
+                local.session = Session(options['url'])
+                local.session.login(options['username'], options['password'])
+                if location is not None:
+                    local.session.request('/locations/select/', [
+                        ('location', location.pk), ('next', '/')])
+            return local.session
+
+        def one_request(number):
+            client = session()
+            started = time.perf_counter()
+            try:
+                if product_ids:
+                    product_id = product_ids[number % len(product_ids)]
+                    client.request('/sales/create/', [
+                        ('product_id', product_id), ('quantity', 1),
+                        ('payment_method', 'cash'), ('discount', 0),
+                        ('discount_type', 'value')])
+                else:
+                    client.request('/')
+                failed = False
+            except (urllib.error.URLError, OSError):
+                failed = True
+            return time.perf_counter() - started, failed
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(one_request,
+                                    range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(duration * 1000 for duration, _ in results)
+        failures = sum(1 for _, failed in results if failed)
+        cuts = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f'{options["scenario"]}: {len(results)} requests, '
+            f'concurrency {options["concurrency"]}, {failures} failed\n'
+            f'  throughput {len(results) / elapsed:.1f} req/s\n'
+            f'  p50 {cuts[49]:.1f} ms  p95 {cuts[94]:.1f} ms  '
+            f'p99 {cuts[98]:.1f} ms  max {latencies[-1]:.1f} ms')
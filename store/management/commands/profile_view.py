@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse, NoReverseMatch
+
+from store.demo_data import seed_demo_data
+from store.profiling import profile_call
+
+
+class Command(BaseCommand):
+    help = ('Profile a view (URL name or path) against seeded demo data. '
+            'Everything runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('view', help="URL name ('sale_list') or path")
+        parser.add_argument('--query', default='',
+                            help="Query string, e.g. 'date_from=2026-01-01'")
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--customers', type=int, default=500)
+        parser.add_argument('--sales', type=int, default=2000)
+        parser.add_argument('--items-per-sale', type=int, default=3)
+
+    def handle(self, *args, **options):
+        path = options['view']
+        if not path.startswith('/'):
+            try:
+                path = reverse(path)
+            except NoReverseMatch:
+                raise CommandError(f'Unknown view "{options["view"]}"')
+        if options['query']:
+            path = f'{path}?{options["query"]}'
+
+        with transaction.atomic():
+            seeded = seed_demo_data(
+                products=options['products'],
+                customers=options['customers'],
+                sales=options['sales'],
+                items_per_sale=options['items_per_sale'],
+            )
+            self.stdout.write(f'Seeded {seeded}')
+
+            client = Client()
+            client.force_login(User.objects.create_superuser(
+                'profile-view', password=None))
+            # The middleware must not profile the request again inside
+            # this session (nested profilers, doubled overhead)
+            with override_settings(REQUEST_PROFILING=False):
+                response, report = profile_call(client.get, path)
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'GET {path} -> {response.status_code}: '
+            f'{report["duration_ms"]:.1f} ms, '
+            f'peak {report["peak_memory_kb"]} KB, '
+            f'{report["query_count"]} queries'))
+        self.stdout.write('\nTop allocation sites:')
+        self.stdout.write(report['top_allocations'])
+        self.stdout.write('\nHot functions:')
+        self.stdout.write(report['hot_functions'])
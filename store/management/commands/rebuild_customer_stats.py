@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from store.services import rebuild_customer_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the CustomerStats table from completed sales'
+
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rebuild_customer_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Customer stats rebuilt for {created} customers.'))
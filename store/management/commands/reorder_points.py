@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.replenishment import reorder_suggestions, apply_reorder_points
+
+
+class Command(BaseCommand):
+    help = ('Compute demand-based reorder points and order quantities for '
+            'every active product from recent sales; --write stores the '
+            'reorder points as min_stock')
+
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90,
+                            help='Sales history to use (days)')
+        parser.add_argument('--lead-time', type=int, default=7,
+                            help='Supplier lead time (days)')
+        parser.add_argument('--review-days', type=int, default=14,
+                            help='Days between orders')
+        parser.add_argument('--service-level', type=float, default=0.95,
+                            help='Target probability of not running out')
+        parser.add_argument('--limit', type=int, default=50,
+                            help='Products to list (0 lists none)')
+        parser.add_argument('--write', action='store_true',
+                            help='Update Product.min_stock')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['lead_time'] < 0:
+            raise CommandError('--days must be >= 1 and --lead-time >= 0')
+        if not 0 < options['service_level'] < 1:
+            raise CommandError('--service-level must be between 0 and 1')
+
+        suggestions = reorder_suggestions(
+            days=options['days'],
+            lead_time=options['lead_time'],
+            review_days=options['review_days'],
+            service_level=options['service_level'],
+        )
+        to_order = sorted(
+            (row for row in suggestions if row['order_quantity']),
+            key=lambda row: row['order_quantity'], reverse=True)
+
+        if options['limit'] and to_order:
+            self.stdout.write(
+                f'{"Product":<40} {"Stock":>7} {"Min":>5} {"Day avg":>8} '
+                f'{"Reorder":>8} {"Order":>7}')
+            for row in to_order[:options['limit']]:
+                self.stdout.write(
+                    f'{row["name"][:40]:<40} {row["stock"]:>7} '
+                    f'{row["min_stock"]:>5} {row["daily_demand"]:>8.2f} '
+                    f'{row["reorder_point"]:>8} {row["order_quantity"]:>7}')
+
+        self.stdout.write(f'{len(suggestions)} products analysed, '
+                          f'{len(to_order)} at or below their reorder point.')
+
+        if options['write']:
+            updated = apply_reorder_points(suggestions,
+                                           options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'min_stock updated for {updated} products.'))
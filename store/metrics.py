@@ -0,0 +1,205 @@
+import bisect
+import contextlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds (the Prometheus client defaults)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNTERS = {
+    'checkouts': 'Sales completed at the checkout.',
+    'sale_cancellations': 'Sales cancelled.',
+}
+
+# Everything below is per process and guarded by one lock: Waitress runs
+# a single process, under Gunicorn each worker reports its own numbers
+_lock = threading.Lock()
+_requests = {}  # (view, method, status): count
+_latency = {}  # view: [count per bucket (+Inf last), sum]
+_queries = {}  # view: count
+_counters = dict.fromkeys(COUNTERS, 0)
+_state = {'in_flight': 0, 'started_at': time.time()}
+_low_stock = {'thread': None, 'count': 0}
+# (the first count runs under its own lock, not the one requests wait on)
+_low_stock_lock = threading.Lock()
+_view_names = set()
+
+
+def increment(name, amount=1):
+    # Inside a transaction the counter only moves once it commits
+    def add():
+        with _lock:
+            _counters[name] += amount
+
+    if connection.in_atomic_block:
+        transaction.on_commit(add)
+    else:
+        add()
+
+
+def in_flight():
+    return _state['in_flight']
+
+
+def view_label(request):
+    # URL name from store.urls; anything else (admin, static, 404s) is
+    # 'other', so the labels stay a short, fixed list
+    if not _view_names:
+        from .urls import urlpatterns
+        _view_names.update(pattern.name for pattern in urlpatterns)
+    match = request.resolver_match
+    if match is not None and match.url_name in _view_names:
+        return match.url_name
+    return 'other'
+
+
+def observe_request(view, method, status, seconds, queries):
+    with _lock:
+        key = (view, method, status)
+        _requests[key] = _requests.get(key, 0) + 1
+        latency = _latency.setdefault(view, [0] * (len(BUCKETS) + 2))
+        latency[bisect.bisect_left(BUCKETS, seconds)] += 1
+        latency[-1] += seconds
+        _queries[view] = _queries.get(view, 0) + queries
+
+
+def _count_low_stock():
+    from .models import Product
+
+    return Product.objects.filter(active=True,
+                                  stock__lte=F('min_stock')).count()
+
+
+def _refresh_low_stock():
+    # Background thread: recounts every METRICS_LOW_STOCK_INTERVAL seconds,
+    # so a scrape only reads the last count
+    while True:
+        time.sleep(settings.METRICS_LOW_STOCK_INTERVAL)
+        try:
+            _low_stock['count'] = _count_low_stock()
+        except DatabaseError:
+            logger.exception('Low stock count failed')
+        finally:
+            connection.close()  # this thread's own connection
+
+
+def low_stock_count():
+    # Counted once on the first scrape, then kept up to date by
+    # _refresh_low_stock, however often /metrics is scraped
+    with _low_stock_lock:
+        if _low_stock['thread'] is None:
+            _low_stock['count'] = _count_low_stock()
+            _low_stock['thread'] = threading.Thread(
+                target=_refresh_low_stock, name='metrics-low-stock',
+                daemon=True)
+            _low_stock['thread'].start()
+    return _low_stock['count']
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def render():
+    """The metrics in the Prometheus text exposition format."""
+    with _lock:
+        requests = dict(_requests)
+        latency = {view: list(values) for view, values in _latency.items()}
+        queries = dict(_queries)
+        counters = dict(_counters)
+    low_stock = low_stock_count()
+
+    lines = [
+        '# HELP store_http_requests_total HTTP requests by URL name.',
+        '# TYPE store_http_requests_total counter',
+    ]
+    for (view, method, status), count in sorted(requests.items()):
+        lines.append(f'store_http_requests_total'
+                     f'{{{_labels(view=view, method=method, status=status)}}}'
+                     f' {count}')
+
+    lines += [
+        '# HELP store_http_request_duration_seconds Request latency by URL '
+        'name.',
+        '# TYPE store_http_request_duration_seconds histogram',
+    ]
+    for view, values in sorted(latency.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), values):
+            cumulative += count
+            lines.append(f'store_http_request_duration_seconds_bucket'
+                         f'{{{_labels(view=view, le=bound)}}} {cumulative}')
+        lines.append(f'store_http_request_duration_seconds_sum'
+                     f'{{{_labels(view=view)}}} {values[-1]:.6f}')
+        lines.append(f'store_http_request_duration_seconds_count'
+                     f'{{{_labels(view=view)}}} {cumulative}')
+
+    lines += [
+        '# HELP store_db_queries_total Database queries by URL name.',
+        '# TYPE store_db_queries_total counter',
+    ]
+    for view, count in sorted(queries.items()):
+        lines.append(f'store_db_queries_total{{{_labels(view=view)}}} '
+                     f'{count}')
+
+    for name, description in COUNTERS.items():
+        lines += [f'# HELP store_{name}_total {description}',
+                  f'# TYPE store_{name}_total counter',
+                  f'store_{name}_total {counters[name]}']
+
+    lines += [
+        '# HELP store_low_stock_products Active products at or below their '
+        'minimum stock.',
+        '# TYPE store_low_stock_products gauge',
+        f'store_low_stock_products {low_stock}',
+        '# HELP store_http_requests_in_flight Requests being served.',
+        '# TYPE store_http_requests_in_flight gauge',
+        f'store_http_requests_in_flight {in_flight()}',
+        '# HELP store_web_threads Threads serving requests (WEB_THREADS).',
+        '# TYPE store_web_threads gauge',
+        f'store_web_threads {settings.WEB_THREADS}',
+        '# HELP process_start_time_seconds Start time of the process.',
+        '# TYPE process_start_time_seconds gauge',
+        f'process_start_time_seconds {_state["started_at"]:.3f}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    Count every request, its latency and its database queries (on every
+    connection, replica included) under the URL name it resolved to.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        with _lock:
+            _state['in_flight'] += 1
+        started = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(count_queries))
+                response = self.get_response(request)
+        finally:
+            with _lock:
+                _state['in_flight'] -= 1
+        observe_request(view_label(request), request.method,
+                        response.status_code,
+                        time.perf_counter() - started, queries[0])
+        return response
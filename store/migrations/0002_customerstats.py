@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-19 06:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='store.customer')),
+                ('sale_count', models.IntegerField(default=0)),
+                ('lifetime_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('average_ticket', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('last_purchase_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Customer stats',
+                'indexes': [models.Index(fields=['sale_count'], name='store_custo_sale_co_1fdf7a_idx'), models.Index(fields=['lifetime_revenue'], name='store_custo_lifetim_573db5_idx'), models.Index(fields=['average_ticket'], name='store_custo_average_cb1686_idx'), models.Index(fields=['last_purchase_at'], name='store_custo_last_pu_f10402_idx')],
+            },
+        ),
+    ]
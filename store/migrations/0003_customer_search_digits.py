@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-19 06:29
+
+import re
+
+from django.db import migrations, models
+
+
+def backfill_digits(apps, schema_editor):
+    Customer = apps.get_model('store', 'Customer')
+    batch = []
+    for customer in Customer.objects.only('cpf', 'phone').iterator(
+            chunk_size=2000):
+        customer.cpf_digits = re.sub(r'\D', '', customer.cpf or '') or None
+        customer.phone_digits = re.sub(r'\D', '', customer.phone or '')
+        batch.append(customer)
+        if len(batch) >= 2000:
+            Customer.objects.bulk_update(batch,
+                                         ['cpf_digits', 'phone_digits'])
+            batch = []
+    Customer.objects.bulk_update(batch, ['cpf_digits', 'phone_digits'])
+
+
+def create_name_trigram_index(apps, schema_editor):
+    # Trigram GIN index lets ILIKE '%...%' name searches use an index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS store_customer_name_trgm '
+        'ON store_customer USING gin (name gin_trgm_ops)')
+
+
+def drop_name_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS store_customer_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_customerstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='cpf_digits',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='phone_digits',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(backfill_digits, migrations.RunPython.noop),
+        migrations.RunPython(create_name_trigram_index,
+                             drop_name_trigram_index),
+    ]
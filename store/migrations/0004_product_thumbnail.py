@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_customer_search_digits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='thumbnail',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
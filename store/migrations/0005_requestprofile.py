@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-19 06:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_product_thumbnail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255)),
+                ('method', models.CharField(max_length=10)),
+                ('view_name', models.CharField(blank=True, max_length=100)),
+                ('status_code', models.IntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('peak_memory_kb', models.IntegerField()),
+                ('query_count', models.IntegerField()),
+                ('top_allocations', models.TextField(blank=True)),
+                ('hot_functions', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='store_reque_created_6bfc89_idx')],
+            },
+        ),
+    ]
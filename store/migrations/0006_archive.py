@@ -0,0 +1,124 @@
+# Generated by Django 5.2 on 2026-10-19 06:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_requestprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSale',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('payment_method', models.CharField(choices=[('cash', 'Dinheiro'), ('debit', 'Cartão de Débito'), ('credit', 'Cartão de Crédito'), ('pix', 'PIX'), ('transferencia', 'Transferência Bancária')], default='cash', max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('discount_type', models.CharField(choices=[('value', 'Valor (R$)'), ('percent', 'Percentagem (%)')], default='value', max_length=10)),
+                ('notes', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('completed', 'Concluída'), ('cancelled', 'Cancelada')], default='completed', max_length=20)),
+                ('cancelled_at', models.DateTimeField(blank=True, null=True)),
+                ('cancellation_reason', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSaleItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.IntegerField(default=1)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedStockMovement',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('movement_type', models.CharField(choices=[('in', 'Entrada'), ('out', 'Saída'), ('adjustment', 'Ajuste')], max_length=20)),
+                ('quantity', models.IntegerField()),
+                ('reason', models.CharField(max_length=200)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['created_at'], name='store_sale_created_885ff5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['status', 'created_at'], name='store_sale_status_e5e3cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['created_at'], name='store_stock_created_957fb4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', 'created_at'], name='store_stock_product_860bf2_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedsale',
+            name='cancelled_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedsale',
+            name='customer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_sales', to='store.customer'),
+        ),
+        migrations.AddField(
+            model_name='archivedsale',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedsaleitem',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_sale_items', to='store.product'),
+        ),
+        migrations.AddField(
+            model_name='archivedsaleitem',
+            name='sale',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='store.archivedsale'),
+        ),
+        migrations.AddField(
+            model_name='archivedstockmovement',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_movements', to='store.product'),
+        ),
+        migrations.AddField(
+            model_name='archivedstockmovement',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedsale',
+            index=models.Index(fields=['created_at'], name='store_archi_created_fcda6b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedsale',
+            index=models.Index(fields=['status', 'created_at'], name='store_archi_status_ba87e6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedstockmovement',
+            index=models.Index(fields=['created_at'], name='store_archi_created_4d8cf8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedstockmovement',
+            index=models.Index(fields=['product', 'created_at'], name='store_archi_product_ea7101_idx'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.2 on 2026-10-19 06:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_default_location(apps, schema_editor):
+    # Existing single-store data moves to a default location
+    Location = apps.get_model('store', 'Location')
+    LocationStock = apps.get_model('store', 'LocationStock')
+    Product = apps.get_model('store', 'Product')
+    Sale = apps.get_model('store', 'Sale')
+    StockMovement = apps.get_model('store', 'StockMovement')
+    ArchivedSale = apps.get_model('store', 'ArchivedSale')
+    ArchivedStockMovement = apps.get_model('store', 'ArchivedStockMovement')
+
+    location = Location.objects.create(name='Loja Principal', code='main')
+    LocationStock.objects.bulk_create([
+        LocationStock(location=location, product_id=product_id,
+                      quantity=stock)
+        for product_id, stock in Product.objects.values_list('id', 'stock')
+    ], batch_size=2000)
+    for model in (Sale, StockMovement, ArchivedSale, ArchivedStockMovement):
+        model.objects.filter(location__isnull=True).update(location=location)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('code', models.SlugField(max_length=20, unique=True)),
+                ('address', models.TextField(blank=True)),
+                ('active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='archivedstockmovement',
+            name='movement_type',
+            field=models.CharField(choices=[('in', 'Entrada'), ('out', 'Saída'), ('adjustment', 'Ajuste'), ('transfer_in', 'Transferência (entrada)'), ('transfer_out', 'Transferência (saída)')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='stock',
+            field=models.IntegerField(default=0, help_text='Total across all locations (see LocationStock)'),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='movement_type',
+            field=models.CharField(choices=[('in', 'Entrada'), ('out', 'Saída'), ('adjustment', 'Ajuste'), ('transfer_in', 'Transferência (entrada)'), ('transfer_out', 'Transferência (saída)')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='archivedsale',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='store.location'),
+        ),
+        migrations.AddField(
+            model_name='archivedstockmovement',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='store.location'),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='sales', to='store.location'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='movements', to='store.location'),
+        ),
+        migrations.CreateModel(
+            name='LocationStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=0)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_levels', to='store.location')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_levels', to='store.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('location', 'product'), name='unique_location_product_stock')],
+            },
+        ),
+        migrations.RunPython(create_default_location,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 06:46
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_locations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('event_type', models.CharField(choices=[('sale_created', 'Venda criada'), ('sale_cancelled', 'Venda cancelada'), ('price_changed', 'Preço alterado'), ('stock_adjusted', 'Estoque ajustado'), ('login', 'Login')], max_length=20)),
+                ('entity_type', models.CharField(blank=True, max_length=30)),
+                ('entity_id', models.BigIntegerField(blank=True, null=True)),
+                ('data', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['created_at', 'id'], name='store_audit_created_db78fa_idx'), models.Index(fields=['entity_type', 'entity_id', 'created_at'], name='store_audit_entity__cae6fc_idx'), models.Index(fields=['event_type', 'created_at'], name='store_audit_event_t_deb1b3_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-19 06:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_price_history(apps, schema_editor):
+    # Current prices become the first history row of every product
+    PriceHistory = apps.get_model('store', 'PriceHistory')
+    Product = apps.get_model('store', 'Product')
+    PriceHistory.objects.bulk_create([
+        PriceHistory(product_id=product_id, price=price, cost=cost,
+                     effective_from=created_at, applied_at=created_at,
+                     reason='Preço inicial')
+        for product_id, price, cost, created_at in Product.objects.values_list(
+            'id', 'price', 'cost', 'created_at').iterator(chunk_size=2000)
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_auditevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('effective_from', models.DateTimeField(default=django.utils.timezone.now)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+                ('reason', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='store.product')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Price history',
+                'ordering': ['-effective_from', '-id'],
+                'indexes': [models.Index(fields=['product', 'effective_from'], name='store_price_product_1c9ad6_idx'), models.Index(fields=['applied_at', 'effective_from'], name='store_price_applied_dcbc2b_idx')],
+            },
+        ),
+        migrations.RunPython(seed_price_history,
+                             migrations.RunPython.noop),
+    ]
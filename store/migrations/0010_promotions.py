@@ -0,0 +1,72 @@
+# Generated by Django 5.2 on 2026-10-19 06:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_price_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedsale',
+            name='promotion_discount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='archivedsaleitem',
+            name='discount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='promotion_discount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='saleitem',
+            name='discount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('percent_off', 'Desconto percentual'), ('quantity_tier', 'Desconto por quantidade'), ('buy_x_get_y', 'Leve X, ganhe Y'), ('basket', 'Desconto no total da venda')], max_length=20)),
+                ('percent', models.DecimalField(decimal_places=2, default=0, help_text='percent_off / quantity_tier / basket', max_digits=5)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, help_text='basket: fixed discount in R$', max_digits=10)),
+                ('min_quantity', models.IntegerField(default=0, help_text='quantity_tier: units per line')),
+                ('buy_quantity', models.IntegerField(default=0, help_text='buy_x_get_y: X')),
+                ('free_quantity', models.IntegerField(default=0, help_text='buy_x_get_y: Y')),
+                ('min_total', models.DecimalField(decimal_places=2, default=0, help_text='basket: minimum total', max_digits=10)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='store.category')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='store.product')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedsaleitem',
+            name='promotion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='store.promotion'),
+        ),
+        migrations.AddField(
+            model_name='saleitem',
+            name='promotion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='store.promotion'),
+        ),
+        migrations.AddIndex(
+            model_name='promotion',
+            index=models.Index(fields=['active', 'ends_at'], name='store_promo_active_5d66d4_idx'),
+        ),
+    ]
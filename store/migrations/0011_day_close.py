@@ -0,0 +1,55 @@
+# Generated by Django 5.2 on 2026-10-19 06:57
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_promotions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditevent',
+            name='event_type',
+            field=models.CharField(choices=[('sale_created', 'Venda criada'), ('sale_cancelled', 'Venda cancelada'), ('price_changed', 'Preço alterado'), ('stock_adjusted', 'Estoque ajustado'), ('day_closed', 'Dia fechado'), ('login', 'Login')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='DayClose',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('closed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sale_count', models.IntegerField(default=0)),
+                ('item_count', models.IntegerField(default=0)),
+                ('gross_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('promotion_discount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cost_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cancelled_count', models.IntegerField(default=0)),
+                ('cancelled_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('lines', models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('closed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='day_closes', to='store.location')),
+            ],
+            options={
+                'ordering': ['-day', 'location'],
+            },
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='day_close',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='sales', to='store.dayclose'),
+        ),
+        migrations.AddConstraint(
+            model_name='dayclose',
+            constraint=models.UniqueConstraint(fields=('day', 'location'), name='unique_day_close'),
+        ),
+    ]
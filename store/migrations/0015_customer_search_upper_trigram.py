@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-19 07:33
+
+from django.db import migrations
+
+
+def create_upper_trigram_indexes(apps, schema_editor):
+    # name__icontains / email__icontains compile to UPPER(col::text) LIKE
+    # UPPER(%s) on PostgreSQL: the trigram indexes must be on that
+    # expression, the one on the raw name (0003) was never used
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('DROP INDEX IF EXISTS store_customer_name_trgm')
+    for column in ('name', 'email'):
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS store_customer_{column}_upper_trgm '
+            f'ON store_customer USING gin ((UPPER({column}::text)) '
+            f'gin_trgm_ops)')
+
+
+def drop_upper_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in ('name', 'email'):
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS store_customer_{column}_upper_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS store_customer_name_trgm '
+        'ON store_customer USING gin (name gin_trgm_ops)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0014_price_history_nullable'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_upper_trigram_indexes,
+                             drop_upper_trigram_indexes),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-19 07:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_customer_search_upper_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedsale',
+            name='day_close',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archived_sales', to='store.dayclose'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-19 09:12
+
+from django.db import migrations
+
+OPENING_REASON = 'Saldo de abertura (estoque anterior ao histórico)'
+
+
+def record_opening_stock(apps, schema_editor):
+    # Stock typed into the product form before the ledger existed has no
+    # movements, and 0007 seeded LocationStock from it: an adjustment per
+    # row, after every movement so far, makes the replay start from it
+    LocationStock = apps.get_model('store', 'LocationStock')
+    StockMovement = apps.get_model('store', 'StockMovement')
+    StockMovement.objects.bulk_create([
+        StockMovement(product_id=product_id, location_id=location_id,
+                      movement_type='adjustment', quantity=quantity,
+                      reason=OPENING_REASON)
+        for product_id, location_id, quantity in LocationStock.objects
+        .order_by('product_id', 'location_id')
+        .values_list('product_id', 'location_id', 'quantity')
+    ], batch_size=2000)
+
+
+def forget_opening_stock(apps, schema_editor):
+    StockMovement = apps.get_model('store', 'StockMovement')
+    StockMovement.objects.filter(movement_type='adjustment',
+                                 reason=OPENING_REASON).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_archived_sale_day_close'),
+    ]
+
+    operations = [
+        migrations.RunPython(record_opening_stock, forget_opening_stock),
+    ]
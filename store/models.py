@@ -1,8 +1,17 @@
+import re
+
 from django.db import models
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import User
+from django.urls import reverse
 from django.utils import timezone
 
 
+def only_digits(value):
+    return re.sub(r'\D', '', value or '')
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
@@ -16,6 +25,21 @@ class Category(models.Model):
         return self.name
 
 
+class Location(models.Model):
+    # A store or warehouse holding its own stock
+    name = models.CharField(max_length=100)
+    code = models.SlugField(max_length=20, unique=True)
+    address = models.TextField(blank=True)
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
 class Product(models.Model):
     name = models.CharField(max_length=200)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL,
@@ -23,15 +47,21 @@ class Product(models.Model):
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     cost = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    stock = models.IntegerField(default=0)
+    stock = models.IntegerField(
+        default=0, help_text="Total across all locations (see LocationStock)")
     min_stock = models.IntegerField(default=5,
                                     help_text="Minimum stock level alert")
     barcode = models.CharField(max_length=50, blank=True, unique=True,
                                null=True)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Base name of the cached thumbnail renditions (see store/thumbnails.py)
+    thumbnail = models.CharField(max_length=255, blank=True, editable=False)
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped by every edit of the catalog fields (not by stock changes), so
+    # an edit based on an older read can be detected instead of overwriting
+    version = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['name']
@@ -39,10 +69,49 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    def save_fields(self, fields, version=None):
+        """
+        UPDATE only `fields` (plus updated_at) and bump the version, leaving
+        stock and every other column to concurrent writers. With `version`
+        the row is only written if it still has that version
+        (UPDATE ... WHERE version = %s); returns False if it had changed.
+        """
+        values, files = {}, []
+        for name in set(fields) | {'updated_at'}:
+            field = self._meta.get_field(name)
+            if isinstance(field, models.FileField):
+                files.append(field)  # stored only once the row is ours
+            else:
+                values[field.attname] = field.pre_save(self, False)
+        rows = Product.objects.filter(pk=self.pk)
+        if version is not None:
+            rows = rows.filter(version=version)
+        if not rows.update(version=models.F('version') + 1, **values):
+            return False
+        if files:
+            # pre_save commits the uploaded file to storage
+            Product.objects.filter(pk=self.pk).update(**{
+                field.attname: field.pre_save(self, False) for field in files})
+        if version is not None:
+            self.version = version + 1
+        return True
+
     @property
     def is_low_stock(self):
         return self.stock <= self.min_stock
 
+    @property
+    def thumbnail_webp_url(self):
+        if self.thumbnail:
+            return reverse('product_rendition', args=[f'{self.thumbnail}.webp'])
+        return None
+
+    @property
+    def thumbnail_jpg_url(self):
+        if self.thumbnail:
+            return reverse('product_rendition', args=[f'{self.thumbnail}.jpg'])
+        return None
+
     @property
     def profit_margin(self):
         if self.cost > 0:
@@ -50,12 +119,130 @@ class Product(models.Model):
         return 0
 
 
+class LocationStock(models.Model):
+    # Stock of one product at one location, read by (location, product)
+    location = models.ForeignKey(Location, on_delete=models.CASCADE,
+                                 related_name='stock_levels')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                related_name='stock_levels')
+    quantity = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'product'],
+                                    name='unique_location_product_stock'),
+        ]
+
+    def __str__(self):
+        return f"{self.product} @ {self.location}: {self.quantity}"
+
+
+class PriceHistory(models.Model):
+    # Every price/cost a product had or will have. Product.price / cost hold
+    # the current row (copied when it becomes effective, see store/pricing.py).
+    # A scheduled change leaves the field it doesn't change empty
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                related_name='price_history')
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True,
+                                blank=True)
+    cost = models.DecimalField(max_digits=10, decimal_places=2, null=True,
+                               blank=True)
+    effective_from = models.DateTimeField(default=timezone.now)
+    applied_at = models.DateTimeField(null=True, blank=True)
+    reason = models.CharField(max_length=200, blank=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
+                             blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-effective_from', '-id']
+        verbose_name_plural = 'Price history'
+        indexes = [
+            models.Index(fields=['product', 'effective_from']),
+            # Pending changes (applied_at IS NULL) that are due
+            models.Index(fields=['applied_at', 'effective_from']),
+        ]
+
+    def __str__(self):
+        value = f'R$ {self.price}' if self.price is not None \
+            else f'custo R$ {self.cost}'
+        return f"{self.product} - {value} ({self.effective_from:%d/%m/%Y %H:%M})"
+
+
+class Promotion(models.Model):
+    # Rules evaluated by store/promotions.py when a sale is priced
+    KINDS = [
+        ('percent_off', 'Desconto percentual'),
+        ('quantity_tier', 'Desconto por quantidade'),
+        ('buy_x_get_y', 'Leve X, ganhe Y'),
+        ('basket', 'Desconto no total da venda'),
+    ]
+
+    name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    # Scope of item rules: a product, a category, or (both empty) everything
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True,
+                                blank=True, related_name='promotions')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE,
+                                 null=True, blank=True,
+                                 related_name='promotions')
+    percent = models.DecimalField(max_digits=5, decimal_places=2, default=0,
+                                  help_text="percent_off / quantity_tier / basket")
+    amount = models.DecimalField(max_digits=10, decimal_places=2, default=0,
+                                 help_text="basket: fixed discount in R$")
+    min_quantity = models.IntegerField(default=0,
+                                       help_text="quantity_tier: units per line")
+    buy_quantity = models.IntegerField(default=0, help_text="buy_x_get_y: X")
+    free_quantity = models.IntegerField(default=0, help_text="buy_x_get_y: Y")
+    min_total = models.DecimalField(max_digits=10, decimal_places=2,
+                                    default=0, help_text="basket: minimum total")
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        indexes = [models.Index(fields=['active', 'ends_at'])]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        errors = {}
+        if not 0 <= self.percent <= 100:
+            errors['percent'] = 'Entre 0 e 100.'
+        if self.kind == 'buy_x_get_y' and (self.buy_quantity < 1 or
+                                           self.free_quantity < 1):
+            errors['buy_quantity'] = 'Informe X e Y (mínimo 1).'
+        if self.kind == 'quantity_tier' and self.min_quantity < 2:
+            errors['min_quantity'] = 'Informe a quantidade mínima (2 ou mais).'
+        if self.kind in ('percent_off', 'quantity_tier') and not self.percent:
+            errors['percent'] = 'Informe a percentagem.'
+        if self.kind == 'basket' and not (self.percent or self.amount):
+            errors['amount'] = 'Informe uma percentagem ou um valor.'
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            errors['ends_at'] = 'Deve ser depois do início.'
+        if errors:
+            raise ValidationError(errors)
+
+    def is_running(self, now):
+        return ((self.starts_at is None or self.starts_at <= now) and
+                (self.ends_at is None or now < self.ends_at))
+
+
 class Customer(models.Model):
     name = models.CharField(max_length=200)
     email = models.EmailField(blank=True)
     phone = models.CharField(max_length=20)
     address = models.TextField(blank=True)
     cpf = models.CharField(max_length=14, blank=True, unique=True, null=True)
+    # Digits-only copies of cpf / phone, indexed for exact and prefix search
+    cpf_digits = models.CharField(max_length=14, blank=True, null=True,
+                                  db_index=True, editable=False)
+    phone_digits = models.CharField(max_length=20, blank=True, db_index=True,
+                                    editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -64,6 +251,39 @@ class Customer(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.cpf_digits = only_digits(self.cpf) or None
+        self.phone_digits = only_digits(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'cpf_digits',
+                                                            'phone_digits'}
+        super().save(*args, **kwargs)
+
+
+class CustomerStats(models.Model):
+    # Purchase aggregates, kept up to date on sale create / cancel
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE,
+                                    primary_key=True, related_name='stats')
+    sale_count = models.IntegerField(default=0)
+    lifetime_revenue = models.DecimalField(max_digits=12, decimal_places=2,
+                                           default=0)
+    average_ticket = models.DecimalField(max_digits=10, decimal_places=2,
+                                         default=0)
+    last_purchase_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Customer stats"
+        indexes = [
+            models.Index(fields=['sale_count']),
+            models.Index(fields=['lifetime_revenue']),
+            models.Index(fields=['average_ticket']),
+            models.Index(fields=['last_purchase_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.customer} ({self.sale_count})"
+
 
 # class Sale(models.Model):
 #     PAYMENT_METHODS = [
@@ -118,9 +338,14 @@ class Sale(models.Model):
         Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name='sales')
     user = models.ForeignKey(
         User, on_delete=models.SET_NULL, null=True, related_name='sales')
+    location = models.ForeignKey(
+        Location, on_delete=models.PROTECT, null=True, related_name='sales')
     payment_method = models.CharField(
         max_length=20, choices=PAYMENT_METHODS, default='cash')
+    # Items total after promotions; the manual discount applies on top
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    promotion_discount = models.DecimalField(max_digits=10, decimal_places=2,
+                                             default=0)
     discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     discount_type = models.CharField(
         max_length=10, choices=DISCOUNT_TYPES, default='value')
@@ -132,13 +357,26 @@ class Sale(models.Model):
     cancelled_by = models.ForeignKey(
         User, on_delete=models.SET_NULL, null=True, blank=True, related_name='cancelled_sales')
     created_at = models.DateTimeField(default=timezone.now)
+    # Set when the day is closed (Z-report); frozen sales are not rescanned
+    day_close = models.ForeignKey(
+        'DayClose', on_delete=models.PROTECT, null=True, blank=True,
+        related_name='sales')
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['status', 'created_at']),
+        ]
 
     def __str__(self):
         return f"Sale #{self.id} - {self.created_at.strftime('%d/%m/%Y %H:%M')}"
 
+    @property
+    def gross_total(self):
+        # Items at list price, before promotions
+        return self.total + self.promotion_discount
+
     @property
     def discount_value(self):
         # Always returns discount as monetary value in R$
@@ -167,6 +405,11 @@ class SaleItem(models.Model):
                                 related_name='sale_items')
     quantity = models.IntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Promotion discount on the line, including its share of basket
+    # promotions, so Sale.total == sum(subtotal - discount)
+    discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    promotion = models.ForeignKey(Promotion, on_delete=models.SET_NULL,
+                                  null=True, blank=True, related_name='+')
 
     def __str__(self):
         return f"{self.product.name} x{self.quantity}"
@@ -175,16 +418,67 @@ class SaleItem(models.Model):
     def subtotal(self):
         return self.quantity * self.price
 
+    @property
+    def net_subtotal(self):
+        # After promotions (the sale's manual discount is applied on top)
+        return self.subtotal - self.discount
+
+
+class DayClose(models.Model):
+    # Z-report: a location's day totals, computed once when the day is
+    # closed (see store/closing.py) and read by later reports
+    day = models.DateField()
+    location = models.ForeignKey(Location, on_delete=models.PROTECT,
+                                 related_name='day_closes')
+    closed_at = models.DateTimeField(default=timezone.now)
+    closed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
+                                  blank=True, related_name='+')
+    sale_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+    # List price, promotions, manual discounts and what was received
+    gross_total = models.DecimalField(max_digits=12, decimal_places=2,
+                                      default=0)
+    promotion_discount = models.DecimalField(max_digits=12, decimal_places=2,
+                                             default=0)
+    discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cost_total = models.DecimalField(max_digits=12, decimal_places=2,
+                                     default=0)
+    cancelled_count = models.IntegerField(default=0)
+    cancelled_total = models.DecimalField(max_digits=12, decimal_places=2,
+                                          default=0)
+    # Same totals per user and payment method
+    lines = models.JSONField(default=list, blank=True,
+                             encoder=DjangoJSONEncoder)
+
+    class Meta:
+        ordering = ['-day', 'location']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'location'],
+                                    name='unique_day_close'),
+        ]
+
+    def __str__(self):
+        return f"Z {self.day:%d/%m/%Y} - {self.location}"
+
+    @property
+    def profit(self):
+        return self.total - self.cost_total
+
 
 class StockMovement(models.Model):
     MOVEMENT_TYPES = [
         ('in', 'Entrada'),
         ('out', 'Saída'),
         ('adjustment', 'Ajuste'),
+        ('transfer_in', 'Transferência (entrada)'),
+        ('transfer_out', 'Transferência (saída)'),
     ]
 
     product = models.ForeignKey(Product, on_delete=models.CASCADE,
                                 related_name='movements')
+    location = models.ForeignKey(Location, on_delete=models.PROTECT,
+                                 null=True, related_name='movements')
     movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPES)
     quantity = models.IntegerField()
     reason = models.CharField(max_length=200)
@@ -193,11 +487,284 @@ class StockMovement(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['product', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_movement_type_display()} - {self.product.name} ({self.quantity})"
+
+
+# PURCHASING
+class Supplier(models.Model):
+    name = models.CharField(max_length=200)
+    cnpj = models.CharField(max_length=18, blank=True)
+    email = models.EmailField(blank=True)
+    phone = models.CharField(max_length=20, blank=True)
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class PurchaseOrder(models.Model):
+    STATUS_CHOICES = [
+        ('open', 'Aberto'),
+        ('partial', 'Parcialmente recebido'),
+        ('received', 'Recebido'),
+        ('cancelled', 'Cancelado'),
+    ]
+
+    supplier = models.ForeignKey(Supplier, on_delete=models.PROTECT,
+                                 related_name='orders')
+    # Where the goods are delivered (and the stock goes in)
+    location = models.ForeignKey(Location, on_delete=models.PROTECT,
+                                 related_name='purchase_orders')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES,
+                              default='open')
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL,
+                                   null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Pedido #{self.id} - {self.supplier}"
+
+    @property
+    def is_open(self):
+        return self.status in ('open', 'partial')
+
+
+class PurchaseOrderItem(models.Model):
+    order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE,
+                              related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT,
+                                related_name='+')
+    quantity = models.PositiveIntegerField()
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    # Sum of the receipts so far (updated by store.purchasing)
+    received_quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'product'],
+                                    name='unique_order_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} x{self.quantity}"
+
+    @property
+    def remaining(self):
+        return max(self.quantity - self.received_quantity, 0)
+
+    @property
+    def subtotal(self):
+        return self.quantity * self.unit_cost
+
+
+class GoodsReceipt(models.Model):
+    # One delivery against an order; its lines went in as 'in' movements
+    order = models.ForeignKey(PurchaseOrder, on_delete=models.PROTECT,
+                              related_name='receipts')
+    location = models.ForeignKey(Location, on_delete=models.PROTECT,
+                                 related_name='+')
+    invoice_number = models.CharField(max_length=50, blank=True)
+    notes = models.TextField(blank=True)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    received_by = models.ForeignKey(User, on_delete=models.SET_NULL,
+                                    null=True, related_name='+')
+    received_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-received_at']
+
+    def __str__(self):
+        return f"Recebimento #{self.id} - Pedido #{self.order_id}"
+
+
+class GoodsReceiptItem(models.Model):
+    receipt = models.ForeignKey(GoodsReceipt, on_delete=models.CASCADE,
+                                related_name='items')
+    order_item = models.ForeignKey(PurchaseOrderItem,
+                                   on_delete=models.PROTECT,
+                                   related_name='receipt_items')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT,
+                                related_name='+')
+    quantity = models.PositiveIntegerField()
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.product.name} x{self.quantity}"
+
+    @property
+    def subtotal(self):
+        return self.quantity * self.unit_cost
+
+
+# ARCHIVE
+# Closed periods are moved here by `manage.py archive_period`, keeping the
+# original primary keys. Read both sides through store/archive.py.
+class ArchivedSale(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(
+        Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_sales')
+    user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, related_name='+')
+    location = models.ForeignKey(
+        Location, on_delete=models.PROTECT, null=True, related_name='+')
+    payment_method = models.CharField(
+        max_length=20, choices=Sale.PAYMENT_METHODS, default='cash')
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    promotion_discount = models.DecimalField(max_digits=10, decimal_places=2,
+                                             default=0)
+    discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    discount_type = models.CharField(
+        max_length=10, choices=Sale.DISCOUNT_TYPES, default='value')
+    notes = models.TextField(blank=True)
+    status = models.CharField(
+        max_length=20, choices=Sale.STATUS_CHOICES, default='completed')
+    cancelled_at = models.DateTimeField(null=True, blank=True)
+    cancellation_reason = models.TextField(blank=True)
+    cancelled_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField()
+    day_close = models.ForeignKey(
+        DayClose, on_delete=models.PROTECT, null=True, blank=True,
+        related_name='archived_sales')
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Archived sale #{self.id} - {self.created_at.strftime('%d/%m/%Y %H:%M')}"
+
+    # Same totals as a live sale (sale_detail renders both)
+    gross_total = Sale.gross_total
+    discount_value = Sale.discount_value
+    final_total = Sale.final_total
+    is_cancelled = Sale.is_cancelled
+
+
+class ArchivedSaleItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    sale = models.ForeignKey(ArchivedSale, on_delete=models.CASCADE,
+                             related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT,
+                                related_name='archived_sale_items')
+    quantity = models.IntegerField(default=1)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    promotion = models.ForeignKey(Promotion, on_delete=models.SET_NULL,
+                                  null=True, blank=True, related_name='+')
+
+    def __str__(self):
+        return f"{self.product.name} x{self.quantity}"
+
+    subtotal = SaleItem.subtotal
+    net_subtotal = SaleItem.net_subtotal
+
+
+class ArchivedStockMovement(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                related_name='archived_movements')
+    location = models.ForeignKey(Location, on_delete=models.PROTECT,
+                                 null=True, related_name='+')
+    movement_type = models.CharField(max_length=20,
+                                     choices=StockMovement.MOVEMENT_TYPES)
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=200)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
+                             related_name='+')
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['product', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.get_movement_type_display()} - {self.product.name} ({self.quantity})"
 
 
+class RequestProfile(models.Model):
+    # Written by store.profiling.RequestProfilingMiddleware
+    path = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    view_name = models.CharField(max_length=100, blank=True)
+    status_code = models.IntegerField()
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
+                             blank=True)
+    duration_ms = models.FloatField()
+    peak_memory_kb = models.IntegerField()
+    query_count = models.IntegerField()
+    top_allocations = models.TextField(blank=True)
+    hot_functions = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at'])]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.peak_memory_kb} KB)"
+
+
+class AuditEvent(models.Model):
+    # Append-only: written in batches by store.audit, never edited
+    EVENT_TYPES = [
+        ('sale_created', 'Venda criada'),
+        ('sale_cancelled', 'Venda cancelada'),
+        ('price_changed', 'Preço alterado'),
+        ('stock_adjusted', 'Estoque ajustado'),
+        ('day_closed', 'Dia fechado'),
+        ('goods_received', 'Mercadoria recebida'),
+        ('login', 'Login'),
+    ]
+
+    created_at = models.DateTimeField(default=timezone.now)
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
+    entity_type = models.CharField(max_length=30, blank=True)
+    entity_id = models.BigIntegerField(null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
+                             blank=True, related_name='+')
+    data = models.JSONField(default=dict, blank=True,
+                            encoder=DjangoJSONEncoder)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['entity_type', 'entity_id', 'created_at']),
+            models.Index(fields=['event_type', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_event_type_display()} - {self.entity_type} #{self.entity_id}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError('Audit events are append-only')
+        super().save(*args, **kwargs)
+
+
 from django.db import models
 
-# Create your models here.
+# Create your models here.
\ No newline at end of file
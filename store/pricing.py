@@ -0,0 +1,137 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Case, When, F, Value, DecimalField, \
+    OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, PriceHistory
+from . import audit
+
+CENTS = Decimal('0.01')
+
+
+def record_price(product, user=None, reason=''):
+    # Product.price / cost were just changed in place: keep the history
+    now = timezone.now()
+    PriceHistory.objects.create(product=product, price=product.price,
+                                cost=product.cost, effective_from=now,
+                                applied_at=now, reason=reason, user=user)
+
+
+def update_costs(costs, products, user=None, reason=''):
+    """
+    costs: {product_id: new cost}; products: {product_id: Product} (their
+    price goes in the history). One grouped UPDATE plus one bulk insert of
+    history rows.
+    """
+    if not costs:
+        return
+    now = timezone.now()
+    Product.objects.filter(pk__in=costs).update(
+        cost=Case(*[When(pk=product_id, then=Value(cost))
+                    for product_id, cost in costs.items()],
+                  default=F('cost'),
+                  output_field=DecimalField(max_digits=10, decimal_places=2)),
+        version=F('version') + 1)
+    PriceHistory.objects.bulk_create([
+        PriceHistory(product_id=product_id, price=products[product_id].price,
+                     cost=cost, effective_from=now, applied_at=now,
+                     reason=reason, user=user)
+        for product_id, cost in costs.items()
+    ], batch_size=1000)
+
+
+def price_at(product, when):
+    # Price in force at `when` (one indexed read on product, effective_from)
+    return PriceHistory.objects.filter(
+        product=product, effective_from__lte=when, price__isnull=False
+    ).order_by('-effective_from', '-id').values_list('price', flat=True).first()
+
+
+def apply_due_prices(now=None):
+    """
+    Copy every price change that became effective onto Product (the value
+    sales read), latest one per product and field, with a single UPDATE ...
+    SET price = (subquery). A field no due change sets keeps its current
+    value (a cost received after a price was scheduled survives). Run on a
+    schedule by the apply_scheduled_prices command; returns the number of
+    products changed.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        # Read the due rows once: re-running the filter for the final
+        # update could mark a row that became due (or was scheduled) in
+        # between as applied without applying it
+        ids = list(PriceHistory.objects.select_for_update().filter(
+            applied_at__isnull=True, effective_from__lte=now
+        ).values_list('pk', flat=True))
+        if not ids:
+            return 0
+        due = PriceHistory.objects.filter(pk__in=ids)
+
+        def latest(field):
+            return Coalesce(Subquery(
+                due.filter(product=OuterRef('pk'),
+                           **{f'{field}__isnull': False})
+                .order_by('-effective_from', '-id').values(field)[:1]
+            ), F(field))
+
+        updated = Product.objects.filter(
+            pk__in=due.values('product_id')
+        ).update(price=latest('price'), cost=latest('cost'),
+                 version=F('version') + 1)
+        due.update(applied_at=now)
+    return updated
+
+
+def schedule_prices(changes, effective_from=None, user=None, reason=''):
+    """
+    changes: {product_id: (price, cost)}, None for a field left as it is
+    when the change applies. Writes the history rows in bulk;
+    changes already effective are applied to Product in the same transaction.
+    """
+    effective_from = effective_from or timezone.now()
+    with transaction.atomic():
+        PriceHistory.objects.bulk_create([
+            PriceHistory(product_id=product_id, price=price, cost=cost,
+                         effective_from=effective_from, reason=reason,
+                         user=user)
+            for product_id, (price, cost) in changes.items()
+        ], batch_size=1000)
+        if effective_from <= timezone.now():
+            apply_due_prices()
+
+
+def _adjust(value, percent, amount):
+    if percent is not None:
+        value = value * (1 + Decimal(str(percent)) / 100)
+    if amount is not None:
+        value = value + Decimal(str(amount))
+    return max(value, Decimal('0')).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def reprice(products, field='price', percent=None, amount=None,
+            effective_from=None, user=None, reason=''):
+    """
+    Bulk repricing: change the price (or cost) of every product in the
+    queryset by a percentage and/or a fixed amount, in one transaction.
+    Returns the number of products repriced.
+    """
+    changes = {}
+    for product_id, price, cost in products.values_list('id', 'price',
+                                                        'cost'):
+        if field == 'price':
+            changes[product_id] = (_adjust(price, percent, amount), None)
+        else:
+            changes[product_id] = (None, _adjust(cost, percent, amount))
+
+    with transaction.atomic():
+        schedule_prices(changes, effective_from, user, reason)
+        # One event for the whole run; the per-product detail is in
+        # PriceHistory
+        audit.record('price_changed', None, user, products=len(changes),
+                     field=field, percent=percent, amount=amount,
+                     effective_from=effective_from, reason=reason)
+    return len(changes)
@@ -0,0 +1,106 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.db import connection
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+TOP_ALLOCATIONS = 15
+TOP_FUNCTIONS = 25
+
+# tracemalloc and cProfile are process wide: profile one request at a time
+_profile_lock = threading.Lock()
+
+
+def profile_call(func, *args, **kwargs):
+    # Runs func under tracemalloc + cProfile and returns (result, report)
+    queries = []
+
+    def count_queries(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(count_queries):
+            profiler.enable()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - started
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    allocations = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+    ]).statistics('lineno')[:TOP_ALLOCATIONS]
+
+    stats_output = io.StringIO()
+    pstats.Stats(profiler, stream=stats_output).sort_stats(
+        'cumulative').print_stats(TOP_FUNCTIONS)
+
+    report = {
+        'duration_ms': duration * 1000,
+        'peak_memory_kb': peak // 1024,
+        'query_count': len(queries),
+        'top_allocations': '\n'.join(str(stat) for stat in allocations),
+        'hot_functions': stats_output.getvalue(),
+    }
+    return result, report
+
+
+class RequestProfilingMiddleware:
+    """
+    Opt-in per request profiling. Enabled for every request with
+    settings.REQUEST_PROFILING, or for a single request by a superuser
+    sending the "X-Profile: 1" header. Results are stored as RequestProfile
+    rows, browsable in the admin.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.wants_profile(request):
+            return self.get_response(request)
+        if not _profile_lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            response, report = profile_call(self.get_response, request)
+        finally:
+            _profile_lock.release()
+
+        profile = self.save_profile(request, response, report)
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
+
+    def wants_profile(self, request):
+        if getattr(settings, 'REQUEST_PROFILING', False):
+            return True
+        user = getattr(request, 'user', None)
+        return (request.META.get(PROFILE_HEADER) == '1' and
+                user is not None and user.is_superuser)
+
+    def save_profile(self, request, response, report):
+        from .models import RequestProfile
+
+        match = request.resolver_match
+        user = getattr(request, 'user', None)
+        return RequestProfile.objects.create(
+            path=request.path[:255],
+            method=request.method,
+            view_name=match.view_name if match else '',
+            status_code=response.status_code,
+            user=user if user is not None and user.is_authenticated else None,
+            **report,
+        )
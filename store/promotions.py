@@ -0,0 +1,161 @@
+import threading
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Count, Max, Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Promotion
+
+CENTS = Decimal('0.01')
+
+# Compiled rules, shared by the threads of this process
+_index = {'version': None, 'rules': None}
+_lock = threading.Lock()
+
+
+def _money(value):
+    return value.quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def _version():
+    # Changes whenever a rule is added, edited or deleted (in any process)
+    row = Promotion.objects.aggregate(changed=Max('updated_at'),
+                                      count=Count('id'))
+    return row['changed'], row['count']
+
+
+def compile_rules(now=None):
+    """
+    Active rules indexed by what they apply to:
+    {'product': {id: [rules]}, 'category': {id: [rules]}, 'all': [rules],
+     'basket': [rules]}
+    """
+    now = now or timezone.now()
+    rules = {'product': {}, 'category': {}, 'all': [], 'basket': []}
+    for rule in Promotion.objects.filter(
+            Q(ends_at__isnull=True) | Q(ends_at__gt=now), active=True):
+        if rule.kind == 'basket':
+            rules['basket'].append(rule)
+        elif rule.product_id:
+            rules['product'].setdefault(rule.product_id, []).append(rule)
+        elif rule.category_id:
+            rules['category'].setdefault(rule.category_id, []).append(rule)
+        else:
+            rules['all'].append(rule)
+    return rules
+
+
+def active_rules():
+    # The compiled index, rebuilt only when the rules changed
+    version = _version()
+    with _lock:
+        if _index['version'] != version or _index['rules'] is None:
+            _index['rules'] = compile_rules()
+            _index['version'] = version
+        return _index['rules']
+
+
+@receiver([post_save, post_delete], sender=Promotion)
+def _rules_changed(sender, **kwargs):
+    with _lock:
+        _index['rules'] = None
+
+
+def line_discount(rule, price, quantity):
+    gross = price * quantity
+    if rule.kind == 'percent_off':
+        return gross * rule.percent / 100
+    if rule.kind == 'quantity_tier':
+        return gross * rule.percent / 100 if quantity >= rule.min_quantity \
+            else Decimal('0')
+    if rule.kind == 'buy_x_get_y':
+        group = rule.buy_quantity + rule.free_quantity
+        if rule.buy_quantity < 1 or rule.free_quantity < 1:
+            return Decimal('0')
+        return (quantity // group) * rule.free_quantity * price
+    return Decimal('0')
+
+
+def basket_discount(rule, subtotal):
+    if subtotal < rule.min_total:
+        return Decimal('0')
+    return subtotal * rule.percent / 100 + rule.amount
+
+
+def price_basket(lines, now=None):
+    """
+    lines: [(product, quantity)], one per product. Returns
+    {'lines': [{'product', 'quantity', 'price', 'discount', 'promotion'}],
+     'gross', 'promotion_discount', 'total', 'basket_promotion'}
+
+    Single pass over the lines against the compiled index (no queries per
+    line). The best item rule wins on each line; the best basket rule is
+    then spread over the lines in proportion to their value.
+    """
+    now = now or timezone.now()
+    rules = active_rules()
+    priced = []
+    for product, quantity in lines:
+        candidates = (rules['product'].get(product.pk, []) +
+                      rules['category'].get(product.category_id, []) +
+                      rules['all'])
+        best, discount = None, Decimal('0')
+        for rule in candidates:
+            if not rule.is_running(now):
+                continue
+            value = line_discount(rule, product.price, quantity)
+            if value > discount:
+                best, discount = rule, value
+        gross = product.price * quantity
+        priced.append({
+            'product': product,
+            'quantity': quantity,
+            'price': product.price,
+            'discount': min(_money(discount), gross),
+            'promotion': best,
+        })
+
+    gross = sum((line['price'] * line['quantity'] for line in priced),
+                Decimal('0'))
+    subtotal = gross - sum((line['discount'] for line in priced),
+                           Decimal('0'))
+
+    basket, extra = None, Decimal('0')
+    for rule in rules['basket']:
+        if rule.is_running(now):
+            value = basket_discount(rule, subtotal)
+            if value > extra:
+                basket, extra = rule, value
+    extra = min(_money(extra), subtotal)
+
+    if extra and subtotal:
+        # Spread over the lines; the rounding leftover (a few cents either
+        # way) goes to the largest lines first, never past a line's net
+        nets = [line['price'] * line['quantity'] - line['discount']
+                for line in priced]
+        shares = [min(_money(extra * net / subtotal), net) for net in nets]
+        leftover = extra - sum(shares)
+        for index in sorted(range(len(priced)), key=nets.__getitem__,
+                            reverse=True):
+            if not leftover:
+                break
+            change = min(leftover, nets[index] - shares[index]) \
+                if leftover > 0 else max(leftover, -shares[index])
+            shares[index] += change
+            leftover -= change
+        for line, share in zip(priced, shares):
+            line['discount'] += share
+            if line['promotion'] is None and share:
+                line['promotion'] = basket
+
+    promotion_discount = sum((line['discount'] for line in priced),
+                             Decimal('0'))
+    return {
+        'lines': priced,
+        'gross': gross,
+        'promotion_discount': promotion_discount,
+        'total': gross - promotion_discount,
+        'basket_promotion': basket,
+    }
@@ -0,0 +1,162 @@
+import heapq
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import ArchivedStockMovement, Location, LocationStock, \
+    Product, StockMovement
+from .stock import INCOMING, apply_stock_deltas, default_location
+from . import audit
+
+STREAM_CHUNK = 5000
+
+
+def product_ranges(chunk_size):
+    # [(first id, last id)] covering the catalog in chunks of ids
+    ids = Product.objects.order_by('pk').values_list('pk', flat=True)
+    first, last = ids.first(), ids.last()
+    if first is None:
+        return []
+    return [(start, min(start + chunk_size - 1, last))
+            for start in range(first, last + 1, chunk_size)]
+
+
+def _scope(queryset, field, product_ids=None, id_range=None):
+    if product_ids is not None:
+        return queryset.filter(**{f'{field}__in': product_ids})
+    if id_range is not None:
+        return queryset.filter(**{f'{field}__gte': id_range[0],
+                                  f'{field}__lte': id_range[1]})
+    return queryset
+
+
+def _movements(model, default_location_id, **scope):
+    # (product, location, id, type, quantity) ordered for the replay;
+    # movements from before locations count for the default one
+    return (
+        _scope(model.objects.all(), 'product', **scope)
+        .annotate(at=Coalesce('location_id', Value(default_location_id),
+                              output_field=IntegerField()))
+        .order_by('product_id', 'at', 'id')
+        .values_list('product_id', 'at', 'id', 'movement_type', 'quantity')
+        .iterator(chunk_size=STREAM_CHUNK)
+    )
+
+
+def replay(rows):
+    """
+    Stock per (product_id, location_id) from a stream of movements ordered
+    by product, location and id: an adjustment sets the quantity, the
+    other types add or remove. Yields ((product_id, location_id), quantity)
+    one group at a time.
+    """
+    for key, group in groupby(rows, key=itemgetter(0, 1)):
+        quantity = 0
+        for _, _, _, movement_type, amount in group:
+            if movement_type == 'adjustment':
+                quantity = amount
+            elif movement_type in INCOMING:
+                quantity += amount
+            else:
+                quantity -= amount
+        yield key, quantity
+
+
+def check_stock(product_ids=None, id_range=None):
+    """
+    Drift between the ledger (live and archived movements, merged in one
+    ordered stream) and the stock tables, for some products or a range of
+    ids. Returns [{'product_id', 'location_id', 'expected', 'actual',
+    'recorded'}]; a location_id of None compares Product.stock with its
+    locations' sum, and recorded is False when the ledger has no movement
+    at all for that product and location.
+    """
+    scope = {'product_ids': product_ids, 'id_range': id_range}
+    location = default_location()
+    default_id = location.pk if location else 0
+    ledger = dict(replay(heapq.merge(
+        _movements(StockMovement, default_id, **scope),
+        _movements(ArchivedStockMovement, default_id, **scope),
+        key=itemgetter(0, 1, 2))))
+
+    stock = {
+        (product_id, location_id): quantity
+        for product_id, location_id, quantity in _scope(
+            LocationStock.objects.all(), 'product', **scope
+        ).values_list('product_id', 'location_id', 'quantity')
+    }
+    drifts, located = [], {}
+    for key in sorted(ledger.keys() | stock.keys()):
+        expected, actual = ledger.get(key, 0), stock.get(key, 0)
+        located[key[0]] = located.get(key[0], 0) + actual
+        if expected != actual:
+            drifts.append({'product_id': key[0], 'location_id': key[1],
+                           'expected': expected, 'actual': actual,
+                           'recorded': key in ledger})
+
+    for product_id, total in _scope(Product.objects.all(), 'pk',
+                                    **scope).values_list('pk', 'stock'):
+        if located.get(product_id, 0) != total:
+            drifts.append({'product_id': product_id, 'location_id': None,
+                           'expected': located.get(product_id, 0),
+                           'actual': total, 'recorded': True})
+    return drifts
+
+
+def fix_drift(product_ids, fix='stock', user=None):
+    """
+    Re-check `product_ids` with their stock rows locked and fix the drift
+    in bulk. fix='stock' moves the stock to what the movements say
+    (grouped F() updates); fix='ledger' keeps the quantities and records
+    an 'adjustment' movement for each, so the ledger agrees. Either way
+    Product.stock becomes the sum of its locations. Returns the drift that
+    was fixed.
+
+    fix='stock' raises ValueError for stock with no movement behind it
+    (stock from before the ledger): zeroing it would lose real inventory.
+    """
+    with transaction.atomic():
+        # Same lock order as a sale: location stock, then the product
+        list(LocationStock.objects.select_for_update().filter(
+            product_id__in=product_ids).values_list('pk'))
+        drifts = check_stock(product_ids=product_ids)
+
+        located = [drift for drift in drifts if drift['location_id']]
+        if fix == 'stock':
+            unrecorded = sorted({drift['product_id'] for drift in located
+                                 if not drift['recorded']})
+            if unrecorded:
+                raise ValueError(
+                    f'No movements for products {unrecorded}: record their '
+                    f'stock with --fix ledger instead')
+            deltas = {}
+            for drift in located:
+                deltas.setdefault(drift['location_id'], {})[
+                    drift['product_id']] = drift['expected'] - drift['actual']
+            for location_id, changes in deltas.items():
+                apply_stock_deltas(Location(pk=location_id), changes)
+        else:
+            StockMovement.objects.bulk_create([
+                StockMovement(product_id=drift['product_id'],
+                              location_id=drift['location_id'],
+                              movement_type='adjustment',
+                              quantity=drift['actual'], user=user,
+                              reason='Reconciliação do estoque')
+                for drift in located
+            ], batch_size=1000)
+
+        Product.objects.filter(
+            pk__in={drift['product_id'] for drift in drifts}
+        ).update(stock=Coalesce(Subquery(
+            LocationStock.objects.filter(product=OuterRef('pk'))
+            .values('product').annotate(total=Sum('quantity'))
+            .values('total')[:1]
+        ), 0))
+
+        if drifts:
+            audit.record('stock_adjusted', None, user, type='reconcile',
+                         fix=fix, drifts=len(drifts))
+    return drifts
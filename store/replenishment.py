@@ -0,0 +1,86 @@
+import datetime
+import math
+from statistics import NormalDist
+
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Product, SaleItem, ArchivedSaleItem
+
+
+def daily_demand(days, now=None):
+    """
+    {product_id: (units sold, sum of squared daily units)} over the last
+    `days` days. One pass per table grouped by product and day; products
+    that did not sell are absent (zero demand).
+    """
+    end = timezone.localtime(now)
+    start = end - datetime.timedelta(days=days)
+    totals = {}
+    for item_model in (SaleItem, ArchivedSaleItem):
+        rows = (
+            item_model.objects.filter(sale__status='completed',
+                                      sale__created_at__gte=start,
+                                      sale__created_at__lt=end)
+            .annotate(day=TruncDate('sale__created_at'))
+            .values_list('product_id', 'day')
+            .annotate(units=Sum('quantity'))
+            .order_by()
+        )
+        for product_id, _day, units in rows.iterator(chunk_size=5000):
+            total, squares = totals.get(product_id, (0, 0))
+            totals[product_id] = (total + units, squares + units * units)
+    return totals
+
+
+def reorder_suggestions(days=90, lead_time=7, review_days=14,
+                        service_level=0.95, now=None):
+    """
+    Reorder point and suggested order quantity for every active product.
+
+    reorder point = mean daily demand * lead time + safety stock, with
+    safety stock = z * daily std dev * sqrt(lead time); the order tops
+    stock up to the demand expected over lead time + review period.
+    """
+    z = NormalDist().inv_cdf(service_level)
+    demand = daily_demand(days, now)
+    cover = lead_time + review_days
+
+    suggestions = []
+    for product_id, name, stock, min_stock in Product.objects.filter(
+            active=True).values_list('id', 'name', 'stock', 'min_stock'
+                                     ).iterator(chunk_size=5000):
+        total, squares = demand.get(product_id, (0, 0))
+        mean = total / days
+        std = math.sqrt(max(squares / days - mean * mean, 0))
+        reorder_point = math.ceil(mean * lead_time +
+                                  z * std * math.sqrt(lead_time))
+        order_up_to = mean * cover + z * std * math.sqrt(cover)
+        suggestions.append({
+            'product_id': product_id,
+            'name': name,
+            'stock': stock,
+            'min_stock': min_stock,
+            'units_sold': total,
+            'daily_demand': mean,
+            'daily_std': std,
+            'reorder_point': reorder_point,
+            'order_quantity': (max(math.ceil(order_up_to - stock), 0)
+                               if stock <= reorder_point else 0),
+        })
+    return suggestions
+
+
+def apply_reorder_points(suggestions, batch_size=1000):
+    # Write reorder points back to Product.min_stock (only rows that
+    # change, and only products that sold in the period)
+    changed = [
+        Product(pk=row['product_id'], min_stock=row['reorder_point'],
+                version=F('version') + 1)  # open product edits conflict
+        for row in suggestions
+        if row['units_sold'] and row['reorder_point'] != row['min_stock']
+    ]
+    Product.objects.bulk_update(changed, ['min_stock', 'version'],
+                                batch_size=batch_size)
+    return len(changed)
@@ -0,0 +1,263 @@
+import re
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (Case, When, F, Func, Q, Value, Count, Sum,
+                              Max, DecimalField, OuterRef, Subquery)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Sale, SaleItem, StockMovement, Location, ArchivedSale, \
+    CustomerStats, only_digits
+from .stock import default_location, apply_stock_deltas
+from . import audit, metrics
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def final_total_expression(prefix=''):
+    # SQL version of Sale.final_total, usable in annotate() / aggregate()
+    total = F(f'{prefix}total')
+    discount = F(f'{prefix}discount')
+    return Case(
+        When(**{f'{prefix}discount_type': 'percent'},
+             then=total - total * discount * Value(Decimal('0.01'))),
+        default=total - discount,
+        output_field=MONEY,
+    )
+
+
+class DecimalRatio(Func):
+    # numerator / denominator as a decimal. SQLite keeps whole decimals as
+    # integers (and casts decimal expressions back to them), so the
+    # division would truncate there (15 / 2 = 7): make it a REAL one
+    template = '(%(expressions)s)'
+    arg_joiner = ' / '
+    output_field = MONEY
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, arg_joiner=' * 1.0 / ',
+                           **extra_context)
+
+
+def items_sum(expression, output_field, item_model=SaleItem):
+    # SUM over each sale's items as a correlated subquery: one value per
+    # sale, which can be summed again without joining (and repeating) rows
+    return Coalesce(Subquery(
+        item_model.objects.filter(sale=OuterRef('pk')).values('sale')
+        .annotate(value=Sum(expression, output_field=output_field))
+        .values('value')[:1]
+    ), 0, output_field=output_field)
+
+
+def sales_summary(sales):
+    """
+    {'count', 'total', 'profit'} of `sales` (live or archived) in one
+    aggregate query.
+
+    The manual discount is spread over the items in proportion to their
+    value, so a sale's items add up to its final total (or to its items
+    total when that is zero) and the allocation needs no per-item division.
+    """
+    final_total = final_total_expression()
+    item_model = sales.model._meta.get_field('items').related_model
+    # (the keys must not shadow Sale fields: F('total') would resolve to them)
+    row = sales.aggregate(
+        count=Count('id'),
+        net=Sum(final_total),
+        revenue=Sum(Case(When(total__gt=0, then=final_total),
+                         default=F('total'), output_field=MONEY)),
+        cost=Sum(items_sum(F('quantity') * F('product__cost'), MONEY,
+                           item_model)),
+    )
+    zero = Decimal('0')
+    return {
+        'count': row['count'],
+        'total': row['net'] or zero,
+        'profit': (row['revenue'] or zero) - (row['cost'] or zero),
+    }
+
+
+# CUSTOMER SEARCH
+CPF_LENGTH = 11
+NUMERIC_QUERY = re.compile(r'^[\d\s().+/-]+$')
+
+
+def customer_search_filter(query):
+    # Numeric queries ("123.456", "(94) 98104") hit the digits-only indexes
+    # with exact / prefix lookups; anything else searches by name or email
+    query = query.strip()
+    digits = only_digits(query)
+    if digits and NUMERIC_QUERY.match(query):
+        if len(digits) == CPF_LENGTH:
+            return Q(cpf_digits=digits) | Q(phone_digits=digits)
+        return (Q(cpf_digits__startswith=digits) |
+                Q(phone_digits__startswith=digits))
+    return Q(name__icontains=query) | Q(email__icontains=query)
+
+
+def search_customers(queryset, query):
+    if not query.strip():
+        return queryset
+    return queryset.filter(customer_search_filter(query))
+
+
+# CUSTOMER STATS
+def record_customer_sale(sale):
+    # Add a completed sale to the customer aggregates (single UPDATE)
+    if not sale.customer_id:
+        return
+
+    value = sale.final_total
+    CustomerStats.objects.get_or_create(customer_id=sale.customer_id)
+    CustomerStats.objects.filter(customer_id=sale.customer_id).update(
+        sale_count=F('sale_count') + 1,
+        lifetime_revenue=F('lifetime_revenue') + value,
+        average_ticket=DecimalRatio(F('lifetime_revenue') + value,
+                                    F('sale_count') + 1),
+        last_purchase_at=Case(
+            When(last_purchase_at__gte=sale.created_at,
+                 then=F('last_purchase_at')),
+            default=Value(sale.created_at),
+        ),
+    )
+
+
+def forget_customer_sales(sales):
+    # Remove cancelled sales from the customer aggregates: one UPDATE per
+    # customer, whatever the number of sales. Run after the status change.
+    removed = {}
+    for sale in sales:
+        if sale.customer_id:
+            count, value = removed.get(sale.customer_id, (0, 0))
+            removed[sale.customer_id] = (count + 1, value + sale.final_total)
+
+    last_purchase = [
+        model.objects.filter(
+            customer_id=OuterRef('customer_id'), status='completed'
+        ).order_by('-created_at').values('created_at')[:1]
+        for model in (Sale, ArchivedSale)
+    ]
+    for customer_id, (count, value) in removed.items():
+        CustomerStats.objects.filter(customer_id=customer_id).update(
+            sale_count=F('sale_count') - count,
+            lifetime_revenue=F('lifetime_revenue') - value,
+            average_ticket=Case(
+                When(sale_count__gt=count, then=DecimalRatio(
+                    F('lifetime_revenue') - value, F('sale_count') - count)),
+                default=Value(0),
+                output_field=MONEY,
+            ),
+            last_purchase_at=Coalesce(*(Subquery(q) for q in last_purchase)),
+        )
+
+
+def forget_customer_sale(sale):
+    forget_customer_sales([sale])
+
+
+def rebuild_customer_stats(batch_size=1000):
+    # Recompute every customer's aggregates from the sales in one grouped
+    # pass per table (archived sales still count towards the lifetime totals)
+    totals = {}
+    for model in (Sale, ArchivedSale):
+        rows = (
+            model.objects.filter(status='completed', customer__isnull=False)
+            .values('customer_id')
+            .annotate(
+                sale_count=Count('id'),
+                revenue=Sum(final_total_expression()),
+                last_purchase_at=Max('created_at'),
+            )
+            .order_by()
+        )
+        for row in rows.iterator(chunk_size=batch_size):
+            current = totals.get(row['customer_id'])
+            if current is None:
+                totals[row['customer_id']] = row
+                continue
+            current['sale_count'] += row['sale_count']
+            current['revenue'] += row['revenue']
+            current['last_purchase_at'] = max(current['last_purchase_at'],
+                                              row['last_purchase_at'])
+
+    with transaction.atomic():
+        CustomerStats.objects.all().delete()
+        CustomerStats.objects.bulk_create([
+            CustomerStats(
+                customer_id=customer_id,
+                sale_count=row['sale_count'],
+                lifetime_revenue=row['revenue'],
+                average_ticket=row['revenue'] / row['sale_count'],
+                last_purchase_at=row['last_purchase_at'],
+            )
+            for customer_id, row in totals.items()
+        ], batch_size=batch_size)
+
+    return len(totals)
+
+
+# CANCELLATION
+def cancel_sales(sale_ids, user, reason=''):
+    """
+    Cancel completed sales atomically: status, stock returned to each
+    sale's location (one grouped UPDATE per location and table), the
+    'in' movements in one bulk insert and the customer stats. Sales that
+    are already cancelled, or whose day is closed, are skipped. Returns the
+    cancelled sales; raises ValueError when a sale has no location and
+    there is no active one to return its stock to.
+    """
+    with transaction.atomic():
+        sales = list(
+            Sale.objects.select_for_update()
+            .filter(pk__in=sale_ids, status='completed',
+                    day_close__isnull=True).order_by('pk')
+        )
+        if not sales:
+            return []
+
+        # Sales from before locations return their stock to the default one
+        unlocated = any(sale.location_id is None for sale in sales)
+        fallback = default_location() if unlocated else None
+        if unlocated and fallback is None:
+            raise ValueError('Nenhum local ativo para devolver o estoque de '
+                             'vendas sem local: ative ou cadastre um local.')
+        location_of = {sale.pk: sale.location_id or fallback.pk
+                       for sale in sales}
+
+        now = timezone.now()
+        Sale.objects.filter(pk__in=[sale.pk for sale in sales]).update(
+            status='cancelled', cancelled_at=now,
+            cancellation_reason=reason, cancelled_by=user)
+        returned = {}  # {location_id: {product_id: quantity}}
+        movements = []
+        for sale_id, product_id, quantity in (
+                SaleItem.objects.filter(sale_id__in=location_of)
+                .values_list('sale_id', 'product_id')
+                .annotate(quantity=Sum('quantity'))
+                .order_by('sale_id', 'product_id')):
+            location_id = location_of[sale_id]
+            per_product = returned.setdefault(location_id, {})
+            per_product[product_id] = per_product.get(product_id, 0) + \
+                quantity
+            movements.append(StockMovement(
+                product_id=product_id, location_id=location_id,
+                movement_type='in', quantity=quantity, user=user,
+                reason=f'Cancelamento da Venda #{sale_id} - {reason}'[:200],
+            ))
+
+        for location_id, deltas in returned.items():
+            apply_stock_deltas(Location(pk=location_id), deltas)
+        StockMovement.objects.bulk_create(movements)
+
+        for sale in sales:
+            sale.status = 'cancelled'
+            sale.cancelled_at = now
+            sale.cancellation_reason = reason
+            sale.cancelled_by = user
+        forget_customer_sales(sales)
+        metrics.increment('sale_cancellations', len(sales))
+        for sale in sales:
+            audit.record('sale_cancelled', sale, user, reason=reason,
+                         total=sale.final_total)
+    return sales
@@ -0,0 +1,131 @@
+import datetime
+import zoneinfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import Sale, ArchivedSale
+from .services import items_sum
+
+WEEKDAYS = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado',
+            'Domingo']
+HOURS = 24
+CELLS = len(WEEKDAYS) * HOURS  # one cell per weekday x hour
+CACHE_SECONDS = 60 * 60
+FORECAST_WEEKS = 4
+PEAKS = 10
+
+
+def week_start(now=None):
+    # Monday 00:00 of the current week, in the store time zone
+    tz = zoneinfo.ZoneInfo(settings.TIME_ZONE)
+    today = timezone.localtime(now, tz).date()
+    monday = today - datetime.timedelta(days=today.weekday())
+    return datetime.datetime.combine(monday, datetime.time.min, tzinfo=tz)
+
+
+def weekly_matrices(weeks, now=None):
+    """
+    Sale and item counts for each of the last `weeks` complete weeks, as
+    flat lists of CELLS values (index = weekday * 24 + hour, Monday = 0).
+    One grouped query per table (hot and archived sales), bucketed by local
+    hour only: week, weekday and hour are derived from the bucket here.
+    Items are summed per sale in a subquery, so only sales rows are grouped.
+    """
+    tz = zoneinfo.ZoneInfo(settings.TIME_ZONE)
+    end = week_start(now)
+    start = end - datetime.timedelta(weeks=weeks)
+    sales = [[0] * CELLS for _ in range(weeks)]
+    items = [[0] * CELLS for _ in range(weeks)]
+
+    for model in (Sale, ArchivedSale):
+        item_model = model._meta.get_field('items').related_model
+        rows = (
+            model.objects.filter(status='completed', created_at__gte=start,
+                                 created_at__lt=end)
+            .annotate(hour=TruncHour('created_at', tzinfo=tz))
+            .values('hour')
+            .annotate(sales=Count('id'),
+                      items=Sum(items_sum('quantity', IntegerField(),
+                                          item_model)))
+            .order_by()
+        )
+        for row in rows:
+            hour = timezone.localtime(row['hour'], tz)
+            week = (hour.date() - start.date()).days // 7
+            cell = hour.weekday() * HOURS + hour.hour
+            sales[week][cell] += row['sales']
+            items[week][cell] += row['items'] or 0
+    return sales, items
+
+
+def _column_means(matrix):
+    # Mean of every cell across weeks (rows). Plain lists on purpose: numpy
+    # is not a dependency, and 52 x 168 cells take ~0.2 ms this way
+    if not matrix:
+        return [0.0] * CELLS
+    return [sum(column) / len(matrix) for column in zip(*matrix)]
+
+
+def _grid(cells):
+    # Flat CELLS list -> 7 rows (weekdays) of 24 hours
+    return [cells[day * HOURS:(day + 1) * HOURS]
+            for day in range(len(WEEKDAYS))]
+
+
+def forecast_next_week(matrix, window=FORECAST_WEEKS):
+    # Seasonal moving average: each weekday/hour is predicted as the mean of
+    # the same weekday/hour over the last `window` weeks
+    return _column_means(matrix[-window:])
+
+
+def staffing_report(weeks=52, now=None):
+    """
+    Weekday x hour heatmap (average sales and items per week) and next
+    week's forecast peaks. Only complete weeks are used, so the result is
+    cached per week.
+    """
+    key = f'staffing_report:{weeks}:{week_start(now).date().isoformat()}'
+    report = cache.get(key)
+    if report is not None:
+        return report
+
+    sales, items = weekly_matrices(weeks, now)
+    forecast_sales = forecast_next_week(sales)
+    forecast_items = forecast_next_week(items)
+    average_sales = _column_means(sales)
+    peak_cells = sorted(range(CELLS), key=lambda cell: forecast_sales[cell],
+                        reverse=True)[:PEAKS]
+    next_monday = week_start(now).date() + datetime.timedelta(weeks=1)
+
+    top = max(average_sales) or 1
+    report = {
+        'weeks': weeks,
+        'heatmap': [
+            {
+                'weekday': weekday,
+                'cells': [
+                    {'sales': sales_value, 'items': items_value,
+                     'alpha': f'{sales_value / top:.2f}'}
+                    for sales_value, items_value in zip(sales_row, items_row)
+                ],
+            }
+            for weekday, sales_row, items_row in zip(
+                WEEKDAYS, _grid(average_sales), _grid(_column_means(items)))
+        ],
+        'peaks': [
+            {
+                'date': next_monday + datetime.timedelta(days=cell // HOURS),
+                'weekday': WEEKDAYS[cell // HOURS],
+                'hour': cell % HOURS,
+                'sales': forecast_sales[cell],
+                'items': forecast_items[cell],
+            }
+            for cell in peak_cells if forecast_sales[cell] > 0
+        ],
+    }
+    cache.set(key, report, CACHE_SECONDS)
+    return report
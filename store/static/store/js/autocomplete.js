@@ -0,0 +1,119 @@
+// Autocomplete inputs (store/widgets/autocomplete.html): search a paginated
+// JSON endpoint as the user types and keep the picked id in the hidden input.
+// Fires "autocomplete:select" (detail = picked item, or null when cleared).
+
+(function() {
+    const DELAY = 250;
+    let timer = null;
+
+    function resultsOf(input) {
+        return input.closest('.autocomplete').querySelector('.autocomplete-results');
+    }
+
+    function select(input, item) {
+        const container = input.closest('.autocomplete');
+        container.querySelector('.autocomplete-value').value = item ? item.id : '';
+        if (item) {
+            input.value = item.text;
+            resultsOf(input).innerHTML = '';
+        }
+        input.dispatchEvent(new CustomEvent('autocomplete:select', {bubbles: true, detail: item}));
+    }
+
+    function addRow(results, text, onClick) {
+        const row = document.createElement('button');
+        row.type = 'button';
+        row.className = 'list-group-item list-group-item-action small';
+        row.textContent = text;
+        if (onClick) {
+            row.addEventListener('click', onClick);
+        } else {
+            row.disabled = true;
+        }
+        results.appendChild(row);
+        return row;
+    }
+
+    // Resolves to the page's results; a response for a query that is no
+    // longer in the input (the user kept typing) is not shown
+    function search(input, page) {
+        const query = input.value;
+        const url = new URL(input.dataset.autocompleteUrl, window.location.origin);
+        url.searchParams.set('q', query);
+        url.searchParams.set('page', page);
+
+        return fetch(url, {credentials: 'same-origin'})
+            .then(response => response.json())
+            .then(data => {
+                if (input.value !== query) {
+                    return [];
+                }
+                const results = resultsOf(input);
+                if (page === 1) {
+                    results.innerHTML = '';
+                    results.dataset.query = query;
+                }
+                results.querySelectorAll('.autocomplete-more').forEach(row => row.remove());
+
+                data.results.forEach(item => {
+                    const text = item.detail ? `${item.text} - ${item.detail}` : item.text;
+                    addRow(results, text, () => select(input, item)).dataset.item = JSON.stringify(item);
+                });
+                if (data.more) {
+                    addRow(results, 'Mais resultados...', () => search(input, page + 1))
+                        .classList.add('autocomplete-more', 'text-primary');
+                }
+                if (page === 1 && !data.results.length) {
+                    addRow(results, 'Nenhum resultado');
+                }
+                return data.results;
+            });
+    }
+
+    document.addEventListener('input', event => {
+        const input = event.target;
+        if (!input.matches('[data-autocomplete-url]')) {
+            return;
+        }
+        select(input, null);
+        clearTimeout(timer);
+        timer = setTimeout(() => search(input, 1), DELAY);
+    });
+
+    // Enter picks the first result. A barcode scanner types the code and
+    // Enter faster than DELAY: when the list is not for the current text
+    // yet, search right away and pick from that response
+    document.addEventListener('keydown', event => {
+        const input = event.target;
+        if (event.key !== 'Enter' || !input.matches('[data-autocomplete-url]')) {
+            return;
+        }
+        event.preventDefault();
+        if (input.closest('.autocomplete').querySelector('.autocomplete-value').value) {
+            return;  // already picked, nothing typed since
+        }
+        const results = resultsOf(input);
+        if (results.dataset.query === input.value) {
+            const first = results.querySelector('[data-item]');
+            if (first) {
+                select(input, JSON.parse(first.dataset.item));
+            }
+            return;
+        }
+        clearTimeout(timer);
+        search(input, 1).then(items => {
+            if (items.length) {
+                select(input, items[0]);
+            }
+        });
+    });
+
+    // Close the lists when clicking elsewhere
+    document.addEventListener('click', event => {
+        document.querySelectorAll('.autocomplete').forEach(container => {
+            if (!container.contains(event.target)) {
+                container.querySelector('.autocomplete-results').innerHTML = '';
+            }
+        });
+    });
+})();
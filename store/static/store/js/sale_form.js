@@ -0,0 +1,91 @@
+// Sale form: item rows, totals and submit validation (store/sale_form.html)
+
+let itemCount = 0;
+
+// Add initial item on page load
+window.onload = function() {
+    addItem();
+}
+
+function addItem() {
+    const template = document.getElementById('item-template');
+    const clone = template.content.cloneNode(true);
+    document.getElementById('items-container').appendChild(clone);
+    itemCount++;
+}
+
+function removeItem(button) {
+    if (itemCount > 1) {
+        button.closest('.item-row').remove();
+        itemCount--;
+        calculateTotal();
+    } else {
+        alert('É necessário pelo menos um produto!');
+    }
+}
+
+// A product was picked (or cleared) in a row's autocomplete
+document.addEventListener('autocomplete:select', event => {
+    const row = event.target.closest('.item-row');
+    if (!row) {
+        return;
+    }
+    const item = event.detail;
+    row.dataset.price = item ? item.price : '';
+    row.querySelector('.item-price').value = item ? 'R$ ' + parseFloat(item.price).toFixed(2) : '';
+    row.querySelector('input[name="quantity"]').max = item ? item.stock : '';
+    calculateTotal();
+});
+
+function calculateTotal() {
+    let subtotal = 0;
+
+    document.querySelectorAll('.item-row').forEach(row => {
+        const productId = row.querySelector('input[name="product_id"]').value;
+        const quantity = parseFloat(row.querySelector('input[name="quantity"]').value) || 0;
+
+        if (productId) {
+            subtotal += (parseFloat(row.dataset.price) || 0) * quantity;
+        }
+    });
+
+    const discountInput = parseFloat(document.getElementById('discount').value) || 0;
+    const discountType = document.getElementById('discount_type').value;
+
+    // Calculate discount value in R$
+    let discountValue = 0;
+    if (discountType === 'percent') {
+        discountValue = subtotal * (discountInput / 100);
+        document.getElementById('discount_hint').textContent =
+            discountInput > 0 ? `Equivalente a R$ ${discountValue.toFixed(2)}` : '';
+    } else {
+        discountValue = discountInput;
+        document.getElementById('discount_hint').textContent = '';
+    }
+
+    const total = subtotal - discountValue;
+
+    document.getElementById('subtotal').textContent = 'R$ ' + subtotal.toFixed(2);
+    document.getElementById('discount-display').textContent = 'R$ ' + discountValue.toFixed(2);
+    document.getElementById('total').textContent = 'R$ ' + Math.max(0, total).toFixed(2);
+}
+
+// Validate form before submit
+document.getElementById('saleForm').onsubmit = function(e) {
+    const rows = document.querySelectorAll('.item-row');
+    let hasItems = false;
+
+    rows.forEach(row => {
+        if (row.querySelector('input[name="product_id"]').value) {
+            hasItems = true;
+        }
+    });
+
+    if (!hasItems) {
+        e.preventDefault();
+        alert('Adicione pelo menos um produto!');
+        return false;
+    }
+
+    return true;
+}
@@ -0,0 +1,134 @@
+// Dashboard sales chart: draws the aggregated series from analytics/sales/
+// as SVG bars (stacked when split by payment method / category).
+
+const CHART_COLORS = ['#004F9F', '#FBB900', '#198754', '#dc3545', '#6f42c1',
+                      '#fd7e14', '#20c997', '#0dcaf0', '#6c757d', '#d63384'];
+const SVG_NS = 'http://www.w3.org/2000/svg';
+
+function formatMoney(value) {
+    return 'R$ ' + Number(value).toLocaleString('pt-BR', {
+        minimumFractionDigits: 2, maximumFractionDigits: 2});
+}
+
+function formatPeriod(iso, bucket) {
+    const date = new Date(iso);
+    if (bucket === 'hour') {
+        return date.toLocaleString('pt-BR', {day: '2-digit', hour: '2-digit'});
+    }
+    if (bucket === 'month') {
+        return date.toLocaleDateString('pt-BR', {month: 'short', year: '2-digit'});
+    }
+    return date.toLocaleDateString('pt-BR', {day: '2-digit', month: '2-digit'});
+}
+
+function svgElement(name, attrs) {
+    const element = document.createElementNS(SVG_NS, name);
+    for (const [key, value] of Object.entries(attrs)) {
+        element.setAttribute(key, value);
+    }
+    return element;
+}
+
+function drawSalesChart(container, legend, data) {
+    container.innerHTML = '';
+    legend.innerHTML = '';
+    if (!data.series.length) {
+        container.innerHTML = '<p class="text-muted">Nenhuma venda no período.</p>';
+        return;
+    }
+
+    // periods -> {group: point}, keeping server order
+    const periods = new Map();
+    const groups = [];
+    for (const point of data.series) {
+        const group = point.group || 'Total';
+        if (!groups.includes(group)) groups.push(group);
+        if (!periods.has(point.period)) periods.set(point.period, {});
+        periods.get(point.period)[group] = point;
+    }
+
+    const totals = [...periods.values()].map(points =>
+        Object.values(points).reduce((sum, p) => sum + Number(p.revenue), 0));
+    const maxTotal = Math.max(...totals) || 1;
+
+    const width = container.clientWidth || 800;
+    const height = 260;
+    const top = 10, bottom = 40, left = 10;
+    const slot = (width - left) / periods.size;
+    const barWidth = Math.max(slot * 0.7, 1);
+    const svg = svgElement('svg', {width: width, height: height,
+                                   viewBox: `0 0 ${width} ${height}`});
+    const labelEvery = Math.ceil(periods.size / 12);
+
+    [...periods.entries()].forEach(([period, points], index) => {
+        const x = left + index * slot + (slot - barWidth) / 2;
+        let y = height - bottom;
+        groups.forEach((group, groupIndex) => {
+            const point = points[group];
+            if (!point) return;
+            const barHeight = Number(point.revenue) / maxTotal * (height - top - bottom);
+            y -= barHeight;
+            const rect = svgElement('rect', {
+                x: x, y: y, width: barWidth, height: barHeight,
+                fill: CHART_COLORS[groupIndex % CHART_COLORS.length],
+            });
+            const title = svgElement('title', {});
+            title.textContent = `${formatPeriod(period, data.bucket)} - ${group}\n` +
+                `Faturamento: ${formatMoney(point.revenue)}\n` +
+                `Lucro: ${formatMoney(point.profit)}\n` +
+                `Vendas: ${point.tickets}\n` +
+                `Ticket médio: ${formatMoney(point.average_ticket)}`;
+            rect.appendChild(title);
+            svg.appendChild(rect);
+        });
+        if (index % labelEvery === 0) {
+            const label = svgElement('text', {
+                x: x + barWidth / 2, y: height - bottom + 15,
+                'text-anchor': 'middle', 'font-size': 11, fill: '#6c757d',
+            });
+            label.textContent = formatPeriod(period, data.bucket);
+            svg.appendChild(label);
+        }
+    });
+    container.appendChild(svg);
+
+    const revenue = totals.reduce((sum, value) => sum + value, 0);
+    const profit = data.series.reduce((sum, p) => sum + Number(p.profit), 0);
+    groups.forEach((group, index) => {
+        const item = document.createElement('span');
+        item.className = 'me-3';
+        const swatch = document.createElement('span');
+        swatch.className = 'd-inline-block me-1';
+        swatch.style.cssText = `width: 10px; height: 10px; background-color: ${CHART_COLORS[index % CHART_COLORS.length]};`;
+        item.append(swatch, group);
+        legend.appendChild(item);
+    });
+    const summary = document.createElement('span');
+    summary.className = 'ms-2 text-muted';
+    summary.textContent = `Faturamento ${formatMoney(revenue)} · Lucro ${formatMoney(profit)}`;
+    legend.appendChild(summary);
+}
+
+function loadSalesChart() {
+    const container = document.getElementById('sales-chart');
+    const legend = document.getElementById('sales-chart-legend');
+    const params = new URLSearchParams({
+        bucket: document.getElementById('sales-chart-bucket').value,
+    });
+    const group = document.getElementById('sales-chart-group').value;
+    if (group) params.set('group_by', group);
+
+    fetch(`${container.dataset.url}?${params}`, {credentials: 'same-origin'})
+        .then(response => response.json())
+        .then(data => drawSalesChart(container, legend, data))
+        .catch(() => {
+            container.innerHTML = '<p class="text-danger">Erro ao carregar o gráfico.</p>';
+        });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    if (!document.getElementById('sales-chart')) return;
+    document.getElementById('sales-chart-bucket').addEventListener('change', loadSalesChart);
+    document.getElementById('sales-chart-group').addEventListener('change', loadSalesChart);
+    loadSalesChart();
+});
@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models import Case, When, F, Value, IntegerField
+
+from .models import Location, LocationStock, Product, StockMovement
+
+SESSION_LOCATION_KEY = 'location_id'
+INCOMING = ('in', 'transfer_in')
+
+
+# LOCATIONS
+def default_location():
+    return Location.objects.filter(active=True).order_by('id').first()
+
+
+def current_location(request):
+    # Location picked in the sidebar (session), else the default one
+    if not hasattr(request, '_current_location'):
+        location = None
+        location_id = request.session.get(SESSION_LOCATION_KEY)
+        if location_id:
+            location = Location.objects.filter(pk=location_id,
+                                               active=True).first()
+        request._current_location = location or default_location()
+    return request._current_location
+
+
+# READS
+def stock_levels(location, product_ids, lock=False):
+    # {product_id: quantity} at one location, one indexed query
+    levels = LocationStock.objects.filter(location=location,
+                                          product_id__in=product_ids)
+    if lock:
+        levels = levels.select_for_update()
+    return dict(levels.values_list('product_id', 'quantity'))
+
+
+# WRITES
+def delta_case(deltas, field):
+    # CASE field WHEN <id> THEN <delta> ... for grouped F() updates
+    return Case(
+        *[When(**{field: product_id}, then=Value(delta))
+          for product_id, delta in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def apply_stock_deltas(location, deltas, update_totals=True):
+    # deltas: {product_id: signed change}. One grouped UPDATE per table,
+    # whatever the number of products, with no read-modify-write in Python.
+    deltas = {product_id: delta for product_id, delta in deltas.items()
+              if delta}
+    if not deltas:
+        return
+
+    LocationStock.objects.bulk_create(
+        [LocationStock(location=location, product_id=product_id)
+         for product_id in deltas],
+        ignore_conflicts=True,
+    )
+    LocationStock.objects.filter(
+        location=location, product_id__in=deltas
+    ).update(quantity=F('quantity') + delta_case(deltas, 'product_id'))
+
+    if update_totals:
+        Product.objects.filter(pk__in=deltas).update(
+            stock=F('stock') + delta_case(deltas, 'pk'))
+
+
+def move_stock(location, quantities, movement_type, reason, user,
+               update_totals=True):
+    # quantities: {product_id: positive quantity}; records one movement each
+    sign = 1 if movement_type in INCOMING else -1
+    with transaction.atomic():
+        apply_stock_deltas(
+            location,
+            {product_id: sign * quantity
+             for product_id, quantity in quantities.items()},
+            update_totals=update_totals,
+        )
+        StockMovement.objects.bulk_create([
+            StockMovement(product_id=product_id, location=location,
+                          movement_type=movement_type, quantity=quantity,
+                          reason=reason, user=user)
+            for product_id, quantity in quantities.items()
+        ])
+
+
+def set_stock(location, product, quantity, reason, user):
+    # 'adjustment' movement: sets the exact quantity held at the location
+    with transaction.atomic():
+        current = stock_levels(location, [product.pk], lock=True).get(
+            product.pk, 0)
+        apply_stock_deltas(location, {product.pk: quantity - current})
+        StockMovement.objects.create(
+            product=product, location=location, movement_type='adjustment',
+            quantity=quantity, reason=reason, user=user)
+
+
+def transfer_stock(source, destination, quantities, reason, user):
+    # Product totals do not change, only where the stock is
+    with transaction.atomic():
+        move_stock(source, quantities, 'transfer_out', reason, user,
+                   update_totals=False)
+        move_stock(destination, quantities, 'transfer_in', reason, user,
+                   update_totals=False)
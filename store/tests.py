@@ -1,3 +1,276 @@
-from django.test import TestCase
+import datetime
+import importlib
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .analytics import sales_series
+from .archive import archive_sales_batch
+from .closing import close_day
+from .forms import PurchaseOrderForm
+from .models import ArchivedSale, AuditEvent, Customer, CustomerStats, \
+    Location, LocationStock, Product, Promotion, Sale, SaleItem, Supplier
+from .pricing import apply_due_prices, reprice, update_costs
+from .promotions import price_basket
+from .reconcile import check_stock, fix_drift
+from .services import cancel_sales, forget_customer_sales, \
+    rebuild_customer_stats, record_customer_sale
+from .stock import default_location
+from . import metrics
+
+
+class ScheduledPriceTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='P2', price=Decimal('5.00'), cost=Decimal('2.00'))
+
+    def test_scheduled_price_keeps_a_later_cost(self):
+        effective_from = timezone.now() + timedelta(days=1)
+        reprice(Product.objects.filter(pk=self.product.pk), 'price',
+                percent=10, effective_from=effective_from)
+        # A goods receipt changes the cost before the new price applies
+        update_costs({self.product.pk: Decimal('3.33')},
+                     {self.product.pk: self.product})
+
+        apply_due_prices(effective_from + timedelta(minutes=1))
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price, Decimal('5.50'))
+        self.assertEqual(self.product.cost, Decimal('3.33'))
+
+    def test_scheduled_cost_keeps_the_price(self):
+        effective_from = timezone.now() + timedelta(days=1)
+        reprice(Product.objects.filter(pk=self.product.pk), 'cost',
+                amount=1, effective_from=effective_from)
+        Product.objects.filter(pk=self.product.pk).update(
+            price=Decimal('6.00'))
+
+        apply_due_prices(effective_from + timedelta(minutes=1))
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price, Decimal('6.00'))
+        self.assertEqual(self.product.cost, Decimal('3.00'))
+
+
+class CustomerStatsTests(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(name='Ana', phone='1')
+
+    def sell(self, total):
+        sale = Sale.objects.create(customer=self.customer,
+                                   payment_method='cash', total=total)
+        record_customer_sale(sale)
+        return sale
+
+    def average_ticket(self):
+        return CustomerStats.objects.get(
+            customer=self.customer).average_ticket
+
+    def test_incremental_average_is_not_truncated(self):
+        self.sell(Decimal('10.00'))
+        self.sell(Decimal('5.00'))
+        self.assertEqual(self.average_ticket(), Decimal('7.50'))
+
+        rebuild_customer_stats()
+        self.assertEqual(self.average_ticket(), Decimal('7.50'))
+
+    def test_average_after_forgetting_a_sale(self):
+        self.sell(Decimal('10.00'))
+        self.sell(Decimal('5.00'))
+        sale = self.sell(Decimal('4.00'))
+        sale.status = 'cancelled'
+        sale.save()
+        forget_customer_sales([sale])
+        self.assertEqual(self.average_ticket(), Decimal('7.50'))
+
+# Pages render without running collectstatic first
+PLAIN_STATIC = override_settings(STORAGES={
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+
+@PLAIN_STATIC
+class ArchivedSaleViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', '', 'x')
+        self.client.force_login(self.user)
+        self.sale = Sale.objects.create(
+            user=self.user, payment_method='cash', total=Decimal('42.00'),
+            created_at=timezone.now() - timedelta(days=900))
+        archive_sales_batch(timezone.now() - timedelta(days=800))
+
+    def test_archived_sale_stays_readable(self):
+        self.assertTrue(ArchivedSale.objects.filter(pk=self.sale.pk).exists())
+        day = timezone.localdate(self.sale.created_at).isoformat()
+
+        response = self.client.get('/sales/', {'date_from': day,
+                                               'date_to': day})
+        self.assertContains(response, f'#{self.sale.pk}<')
+        self.assertContains(response, '42,00')
+
+        response = self.client.get(f'/sales/{self.sale.pk}/')
+        self.assertContains(response, 'ARQUIVADA')
+        self.assertNotContains(response, 'Cancelar Venda')
+
+    def test_sale_list_query_budget(self):
+        # Session and user, then the archive probe, the closed days' Z
+        # totals, the open sales summary and the page
+        with self.assertNumQueries(6):
+            self.client.get('/sales/', {'date_from': '2099-01-01'})
+        # Reaching the archive adds its summary and its rows
+        with self.assertNumQueries(8):
+            self.client.get('/sales/')
+
+
+class CloseDayTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name='Loja 2', code='loja-2')
+
+    def test_today_needs_force(self):
+        today = timezone.localdate()
+        with self.assertRaises(ValueError):
+            close_day(today, self.location)
+        close = close_day(today, self.location, force=True)
+        self.assertEqual(close.day, today)
+
+    def test_past_day_closes(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        self.assertEqual(close_day(yesterday, self.location).day, yesterday)
+
+
+@PLAIN_STATIC
+class AuditEventAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_superuser('admin', '', 'x'))
+        # 23:30 local time is already the next day in UTC
+        self.day = datetime.date(2026, 3, 10)
+        AuditEvent.objects.create(
+            event_type='sale_created', created_at=timezone.make_aware(
+                datetime.datetime.combine(self.day, datetime.time(23, 30))))
+
+    def events(self, **params):
+        response = self.client.get('/admin/store/auditevent/', params)
+        return response.context['events']
+
+    def test_date_filter_uses_local_days(self):
+        day = self.day.isoformat()
+        next_day = (self.day + timedelta(days=1)).isoformat()
+        self.assertEqual(len(self.events(date_from=day, date_to=day)), 1)
+        self.assertEqual(len(self.events(date_from=next_day)), 0)
+        self.assertEqual(len(self.events(date_to=next_day)), 1)
+
+
+class LegacyStockTests(TestCase):
+    # Stock typed in before the ledger existed: no movement behind it
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Legado', price=Decimal('1.00'), stock=10)
+        LocationStock.objects.create(location=default_location(),
+                                     product=self.product, quantity=10)
+
+    def test_fix_stock_keeps_unrecorded_stock(self):
+        drifts = check_stock(product_ids=[self.product.pk])
+        self.assertFalse(drifts[0]['recorded'])
+        with self.assertRaises(ValueError):
+            fix_drift([self.product.pk], 'stock')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
+
+    def test_opening_movements_match_the_stock(self):
+        migration = importlib.import_module(
+            'store.migrations.0017_opening_stock_movements')
+        migration.record_opening_stock(apps, None)
+        self.assertEqual(check_stock(product_ids=[self.product.pk]), [])
+
+
+class PurchaseOrderFormTests(TestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Fornecedor')
+        self.product = Product.objects.create(name='P', price=Decimal('1.00'))
+
+    def form(self, cost):
+        return PurchaseOrderForm({
+            'supplier': self.supplier.pk,
+            'location': default_location().pk,
+            'lines': f'{self.product.pk}; 2; {cost}',
+        })
+
+    def test_cost_must_be_a_finite_number(self):
+        self.assertTrue(self.form('3,50').is_valid())
+        for cost in ('nan', 'NaN', 'inf', '-Infinity', 'snan'):
+            form = self.form(cost)
+            self.assertFalse(form.is_valid())
+            self.assertIn('lines', form.errors)
+
+
+class MonitoringTests(TestCase):
+    def test_scrape_reads_the_last_low_stock_count(self):
+        # The background thread is already running: no COUNT per scrape
+        with mock.patch.dict(metrics._low_stock,
+                             {'thread': object(), 'count': 3}):
+            with self.assertNumQueries(0):
+                body = metrics.render()
+        self.assertIn('store_low_stock_products 3\n', body)
+
+    def test_health_hides_error_details(self):
+        with mock.patch('store.health.cache.set',
+                        side_effect=ConnectionError('redis://secret:6379')), \
+                self.assertLogs('store.health', 'ERROR'):
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['checks']['cache'], 'error')
+        self.assertNotContains(response, 'secret', status_code=503)
+
+
+class SalesSeriesTests(TestCase):
+    def test_fixed_discount_split_is_not_truncated(self):
+        product = Product.objects.create(name='P', price=Decimal('10.00'))
+        sale = Sale.objects.create(payment_method='cash',
+                                   total=Decimal('15.00'),
+                                   discount_type='value',
+                                   discount=Decimal('5.00'))
+        for price in ('10.00', '5.00'):
+            SaleItem.objects.create(sale=sale, product=product, quantity=1,
+                                    price=Decimal(price))
+        # 10 - 10 * 5 / 15 + 5 - 5 * 5 / 15: 10.00, not 11 (integer split)
+        [point] = sales_series('day')
+        self.assertEqual(point['revenue'], Decimal('10.00'))
+
+
+class BasketPromotionTests(TestCase):
+    def test_rounding_leftover_never_exceeds_a_line(self):
+        Promotion.objects.create(name='R$ 0,44', kind='basket',
+                                 amount=Decimal('0.44'))
+        lines = [(Product.objects.create(name=f'P{n}', price=Decimal('0.50')),
+                  1) for n in range(10)]
+        # Each 0.50 line gets 0.0439 -> 0.04: 0.04 is left for the 0.01 one
+        lines.append((Product.objects.create(name='Bala',
+                                             price=Decimal('0.01')), 1))
+
+        basket = price_basket(lines)
+
+        self.assertEqual(basket['promotion_discount'], Decimal('0.44'))
+        for line in basket['lines']:
+            self.assertLessEqual(line['discount'],
+                                 line['price'] * line['quantity'])
+
+
+class CancelSaleTests(TestCase):
+    def test_sale_without_location_needs_an_active_one(self):
+        user = User.objects.create_superuser('admin', '', 'x')
+        sale = Sale.objects.create(payment_method='cash',
+                                   total=Decimal('1.00'))
+        Location.objects.update(active=False)
+        with self.assertRaises(ValueError):
+            cancel_sales([sale.pk], user)
+        sale.refresh_from_db()
+        self.assertEqual(sale.status, 'completed')
@@ -0,0 +1,61 @@
+import hashlib
+import os
+import re
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# Rendered at 2x the 50px shown in product_list for HiDPI screens
+THUMBNAIL_SIZE = (100, 100)
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# <original name>.<content hash>.<w>x<h>.<ext>, stored next to the original
+RENDITION_PATTERN = re.compile(
+    r'^products/[^/]+\.[0-9a-f]{12}\.\d+x\d+\.(webp|jpg)$')
+
+
+def rendition_base(image_name, digest, size=THUMBNAIL_SIZE):
+    root = os.path.splitext(image_name)[0]
+    return f'{root}.{digest}.{size[0]}x{size[1]}'
+
+
+def build_rendition(image_name, size=THUMBNAIL_SIZE):
+    # Returns the rendition base name; files already on disk are reused
+    with default_storage.open(image_name, 'rb') as original:
+        data = original.read()
+
+    base = rendition_base(image_name,
+                          hashlib.sha256(data).hexdigest()[:12], size)
+    missing = [ext for ext in THUMBNAIL_FORMATS
+               if not default_storage.exists(f'{base}.{ext}')]
+    if not missing:
+        return base
+
+    # Pillow is only needed here; importing it lazily keeps it out of the
+    # startup of every command and worker that loads the URLconf
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        thumbnail = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+
+    for ext in missing:
+        pil_format, options = THUMBNAIL_FORMATS[ext]
+        buffer = BytesIO()
+        thumbnail.save(buffer, pil_format, **options)
+        default_storage.save(f'{base}.{ext}', ContentFile(buffer.getvalue()))
+
+    return base
+
+
+def refresh_product_thumbnail(product):
+    thumbnail = build_rendition(product.image.name) if product.image else ''
+    if thumbnail != product.thumbnail:
+        product.thumbnail = thumbnail
+        type(product).objects.filter(pk=product.pk).update(
+            thumbnail=thumbnail)
+    return thumbnail
@@ -13,6 +13,9 @@ urlpatterns = [
          name='product_update'),
     path('products/<int:pk>/delete/', views.product_delete,
          name='product_delete'),
+    path('products/reprice/', views.product_reprice, name='product_reprice'),
+    path('products/renditions/<path:name>', views.product_rendition,
+         name='product_rendition'),
 
     # Categories
     path('categories/', views.category_list, name='category_list'),
@@ -36,4 +39,38 @@ urlpatterns = [
     # Stock
     path('stock/movements/', views.stock_movements, name='stock_movements'),
     path('stock/adjustment/', views.stock_adjustment, name='stock_adjustment'),
+    path('stock/transfer/', views.stock_transfer, name='stock_transfer'),
+
+    # Purchasing
+    path('purchases/', views.purchase_order_list, name='purchase_order_list'),
+    path('purchases/create/', views.purchase_order_create,
+         name='purchase_order_create'),
+    path('purchases/<int:pk>/', views.purchase_order_detail,
+         name='purchase_order_detail'),
+    path('purchases/<int:pk>/receive/', views.purchase_order_receive,
+         name='purchase_order_receive'),
+    path('purchases/<int:pk>/cancel/', views.purchase_order_cancel,
+         name='purchase_order_cancel'),
+
+    # Locations
+    path('locations/select/', views.set_location, name='set_location'),
+
+    # Autocomplete
+    path('autocomplete/products/', views.product_autocomplete,
+         name='product_autocomplete'),
+    path('autocomplete/customers/', views.customer_autocomplete,
+         name='customer_autocomplete'),
+
+    # Analytics
+    path('analytics/sales/', views.sales_series_api,
+         name='sales_series_api'),
+    path('reports/staffing/', views.staffing_report, name='staffing_report'),
+    path('reports/day-close/', views.day_close, name='day_close'),
+    path('reports/day-close/<int:pk>/', views.day_close_report,
+         name='day_close_report'),
+
+    # Health / metrics
+    path('healthz', views.healthz, name='healthz'),
+    path('readyz', views.readyz, name='readyz'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -3,17 +3,42 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import authenticate
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, Http404
+from django.conf import settings
+from django.views.static import serve
+from django.db import transaction
 from django.db.models import Sum, Count, Q, F
+from django.views.decorators.http import require_POST, require_safe
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.http import url_has_allowed_host_and_scheme
 import datetime
 from datetime import timedelta
-from .models import Product, Category, Customer, Sale, SaleItem, StockMovement
+from decimal import Decimal
+from .models import Product, Category, Customer, Sale, SaleItem, \
+    StockMovement, Location, LocationStock, PriceHistory, DayClose, \
+    PurchaseOrder, ArchivedSale, ArchivedStockMovement
 from .forms import ProductForm, CategoryForm, CustomerForm, SaleForm, \
-    StockMovementForm
+    StockMovementForm, StockTransferForm, RepriceForm, DayCloseForm, \
+    PurchaseOrderForm, GoodsReceiptForm
+from .services import record_customer_sale, cancel_sales, \
+    search_customers, sales_summary, final_total_expression, MONEY
+from .stock import SESSION_LOCATION_KEY, current_location, \
+    stock_levels, move_stock, set_stock, transfer_stock
+from .db_routers import read_from_replica
+from . import audit, health, metrics
+from .pricing import record_price, reprice
+from .promotions import price_basket
+from .closing import close_day, closed_summary
+from .archive import history_rows, reaches_archive
+from .purchasing import create_order, receive_goods
+from .choices import autocomplete_page, cached_choices
+from .rows import sale_rows, customer_rows, movement_rows
+from .thumbnails import RENDITION_PATTERN, refresh_product_thumbnail
 
 
 @login_required
+@read_from_replica
 def dashboard(request):
     # Get statistics
     today = timezone.now().date()
@@ -48,8 +73,8 @@ def dashboard(request):
             for item in sale.items.all():
                 # Use final_total proportionally to account for discount
                 discount_ratio = sale.final_total / sale.total if sale.total > 0 else 1
-                profit_per_item = (
-                                              item.price * discount_ratio - item.product.cost) * item.quantity
+                profit_per_item = (item.net_subtotal * discount_ratio -
+                                   item.product.cost * item.quantity)
                 total_profit += profit_per_item
         return total_profit
 
@@ -62,7 +87,28 @@ def dashboard(request):
     def calculate_total(sales_qs):
         return sum(sale.final_total for sale in sales_qs)
 
+    # Stock and this month's sales per location, one grouped query each
+    stock_by_location = LocationStock.objects.values(
+        'location__name'
+    ).annotate(
+        units=Sum('quantity'),
+        stock_value=Sum(F('quantity') * F('product__cost'),
+                        output_field=MONEY),
+    ).order_by('location__name')
+    sales_by_location = {
+        row['location__name']: row
+        for row in month_sales.values('location__name').annotate(
+            sales_count=Count('id'),
+            revenue=Sum(final_total_expression()),
+        ).order_by()
+    }
+    locations_summary = [
+        {**row, **sales_by_location.get(row['location__name'], {})}
+        for row in stock_by_location
+    ]
+
     context = {
+        'locations_summary': locations_summary,
         'today_sales_total': calculate_total(today_sales),
         'week_sales_total': calculate_total(week_sales),
         'month_sales_total': calculate_total(month_sales),
@@ -82,6 +128,7 @@ def dashboard(request):
 
 # PRODUCT VIEWS
 @login_required
+@read_from_replica
 def product_list(request):
     query = request.GET.get('q', '')
     category_id = request.GET.get('category', '')
@@ -98,7 +145,11 @@ def product_list(request):
     if category_id:
         products = products.filter(category_id=category_id)
 
-    categories = Category.objects.all()
+    categories = cached_choices(Category.objects.all())
+
+    # Thumbnails are built on upload and, for older images, by the
+    # build_thumbnails command: the list falls back to the original
+    products = products.select_related('category')
 
     context = {
         'products': products,
@@ -115,7 +166,18 @@ def product_create(request):
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES)
         if form.is_valid():
-            product = form.save()
+            with transaction.atomic():
+                product = form.save(commit=False)
+                initial_stock = product.stock
+                product.stock = 0
+                product.save()
+                record_price(product, request.user, 'Preço inicial')
+                if initial_stock:
+                    move_stock(current_location(request),
+                               {product.pk: initial_stock}, 'in',
+                               'Estoque inicial', request.user)
+                    product.stock = initial_stock
+            refresh_product_thumbnail(product)
             messages.success(request,
                              f'Produto "{product.name}" criado com sucesso!')
             return redirect('product_list')
@@ -130,18 +192,83 @@ def product_create(request):
 def product_update(request, pk):
     product = get_object_or_404(Product, pk=pk)
 
+    conflicts = []
+
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES, instance=product)
         if form.is_valid():
-            form.save()
-            messages.success(request,
-                             f'Produto "{product.name}" alterado com sucesso!')
-            return redirect('product_list')
+            # Only the changed columns are written (never stock), and only
+            # if nobody edited the product since this form was loaded
+            changed = [name for name in form.changed_data if name != 'version']
+            with transaction.atomic():
+                saved = product.save_fields(changed,
+                                            form.cleaned_data['version'])
+                if saved and {'price', 'cost'} & set(changed):
+                    record_price(product, request.user, 'Alteração manual')
+            if saved:
+                if 'image' in changed:
+                    refresh_product_thumbnail(product)
+                if 'price' in changed:
+                    audit.record('price_changed', product, request.user,
+                                 old=form.initial['price'], new=product.price)
+                messages.success(request,
+                                 f'Produto "{product.name}" alterado com sucesso!')
+                return redirect('product_list')
+
+            # Conflict: show what changed meanwhile and keep the user's
+            # values, now based on the current version
+            product = Product.objects.get(pk=pk)
+            for name, field in form.fields.items():
+                if field.disabled or name in ('version', 'image'):
+                    continue
+                mine, current = form.cleaned_data[name], getattr(product, name)
+                if mine != current:
+                    conflicts.append({'label': form[name].label,
+                                      'mine': mine, 'current': current})
+            data = request.POST.copy()
+            data['version'] = product.version
+            form = ProductForm(data, instance=product)
+            messages.warning(
+                request, 'Este produto foi alterado por outra pessoa enquanto '
+                         'você editava. Confira os valores e salve novamente.')
+            if 'image' in changed:
+                messages.warning(request, 'Selecione a imagem novamente.')
     else:
         form = ProductForm(instance=product)
 
     return render(request, 'store/product_form.html',
-                  {'form': form, 'action': 'Alterar', 'product': product})
+                  {'form': form, 'action': 'Alterar', 'product': product,
+                   'conflicts': conflicts})
+
+
+@login_required
+def product_reprice(request):
+    # Bulk repricing, now or scheduled (applied by apply_scheduled_prices)
+    if request.method == 'POST':
+        form = RepriceForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            products = Product.objects.filter(active=True)
+            if data['category']:
+                products = products.filter(category=data['category'])
+            count = reprice(products, data['field'], data['percent'],
+                            data['amount'], data['effective_from'],
+                            request.user, data['reason'])
+            when = 'imediatamente'
+            if data['effective_from']:
+                when = timezone.localtime(data['effective_from']).strftime(
+                    'a partir de %d/%m/%Y %H:%M')
+            messages.success(request,
+                             f'{count} produtos reajustados ({when}).')
+            return redirect('product_reprice')
+    else:
+        form = RepriceForm()
+
+    scheduled = PriceHistory.objects.filter(
+        applied_at__isnull=True).select_related('product').order_by(
+        'effective_from', 'product__name')[:100]
+    return render(request, 'store/product_reprice.html',
+                  {'form': form, 'scheduled': scheduled})
 
 
 @login_required
@@ -149,8 +276,9 @@ def product_delete(request, pk):
     product = get_object_or_404(Product, pk=pk)
 
     if request.method == 'POST':
+        # Only the flag: stock may be changing under concurrent sales
         product.active = False
-        product.save()
+        product.save_fields(['active'])
         messages.success(request,
                          f'Produto "{product.name}" eliminado com sucesso!')
         return redirect('product_list')
@@ -159,8 +287,18 @@ def product_delete(request, pk):
                   {'product': product})
 
 
+def product_rendition(request, name):
+    # Rendition names carry a content hash, so they can be cached forever
+    if not RENDITION_PATTERN.match(name):
+        raise Http404
+    response = serve(request, name, document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
 # CATEGORY VIEWS
 @login_required
+@read_from_replica
 def category_list(request):
     categories = Category.objects.annotate(product_count=Count('products'))
     return render(request, 'store/category_list.html',
@@ -217,21 +355,33 @@ def category_delete(request, pk):
 
 
 # CUSTOMER VIEWS
+CUSTOMER_SORTS = {
+    'name': F('name').asc(),
+    'sales': F('stats__sale_count').desc(nulls_last=True),
+    'revenue': F('stats__lifetime_revenue').desc(nulls_last=True),
+    'average': F('stats__average_ticket').desc(nulls_last=True),
+    'last_purchase': F('stats__last_purchase_at').desc(nulls_last=True),
+}
+
+
 @login_required
+@read_from_replica
 def customer_list(request):
     query = request.GET.get('q', '')
-    customers = Customer.objects.all()
+    sort = request.GET.get('sort', 'name')
+    if sort not in CUSTOMER_SORTS:
+        sort = 'name'
+
+    # Stats come in the same query (LEFT JOIN), never per row
+    customers = Customer.objects.select_related('stats').order_by(
+        CUSTOMER_SORTS[sort], 'name')
 
     if query:
-        customers = customers.filter(
-            Q(name__icontains=query) |
-            Q(phone__icontains=query) |
-            Q(email__icontains=query) |
-            Q(cpf__icontains=query)
-        )
+        customers = search_customers(customers, query)
 
     return render(request, 'store/customer_list.html',
-                  {'customers': customers, 'query': query})
+                  {'customers': customer_rows(customers), 'query': query,
+                   'sort': sort})
 
 
 @login_required
@@ -270,35 +420,39 @@ def customer_update(request, pk):
 
 # SALE VIEWS
 @login_required
+@read_from_replica
 def sale_list(request):
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
 
-    sales = Sale.objects.filter(status='completed')
+    filters = {'status': 'completed'}
 
     if date_from:
-        sales = sales.filter(created_at__date__gte=date_from)
+        filters['created_at__date__gte'] = date_from
 
     if date_to:
-        sales = sales.filter(created_at__date__lte=date_to)
-
-    # Use final_total (after discount) for revenue
-    total = sum(sale.final_total for sale in sales)
-    sales_count = sales.count()
-
-    # Calculate profit considering discount
-    total_profit = 0
-    for sale in sales:
-        discount_ratio = sale.final_total / sale.total if sale.total > 0 else 1
-        for item in sale.items.all():
-            profit_per_item = (
-                                          item.price * discount_ratio - item.product.cost) * item.quantity
-            total_profit += profit_per_item
+        filters['created_at__date__lte'] = date_to
+
+    sales = Sale.objects.filter(**filters)
+    # Archived sales stay listed and counted when the range reaches them
+    archived = ArchivedSale.objects.filter(**filters) \
+        if reaches_archive(ArchivedSale, date_from) else None
+
+    # Closed days come from their frozen Z totals; the open sales are
+    # summed by one aggregate query (per table) and the page by another.
+    # Budget: archive probe + Z totals + summary + page, two more
+    # (archived summary and rows) when the range reaches the archive
+    closed = closed_summary(date_from, date_to)
+    summary = sales_summary(sales.filter(day_close__isnull=True))
+    if archived is not None:
+        older = sales_summary(archived.filter(day_close__isnull=True))
+        summary = {key: summary[key] + older[key] for key in summary}
 
     context = {
-        'sales': sales[:50],
-        'total': total,
-        'total_profit': total_profit,
+        'sales': history_rows(sale_rows, sales, archived, 50),
+        'sale_count': closed['sales'] + summary['count'],
+        'total': closed['total'] + summary['total'],
+        'total_profit': closed['profit'] + summary['profit'],
         'date_from': date_from,
         'date_to': date_to,
     }
@@ -321,75 +475,94 @@ def sale_create(request):
             messages.error(request, 'Add at least one product to the sale!')
             return redirect('sale_create')
 
-        # Create sale
-        sale = Sale.objects.create(
-            user=request.user,
-            customer_id=customer_id if customer_id else None,
-            payment_method=payment_method,
-            discount=float(discount) if discount else 0,
-            discount_type=discount_type,  # NEW
-            notes=request.POST.get('notes', '')
-        )
+        location = current_location(request)
+        lines = [(int(prod_id), int(qty))
+                 for prod_id, qty in zip(product_ids, quantities)
+                 if prod_id and qty]
+        needed = {}
+        for prod_id, quantity in lines:
+            needed[prod_id] = needed.get(prod_id, 0) + quantity
 
-        total = 0
-
-        # Add items to sale
-        for prod_id, qty in zip(product_ids, quantities):
-            if prod_id and qty:
-                product = Product.objects.get(id=prod_id)
-                quantity = int(qty)
+        if not needed:
+            messages.error(request, 'Add at least one product to the sale!')
+            return redirect('sale_create')
 
-                if product.stock < quantity:
+        with transaction.atomic():
+            # One query for the products, one (locking) for their stock here
+            products = Product.objects.in_bulk(needed)
+            available = stock_levels(location, needed, lock=True)
+            for prod_id, quantity in needed.items():
+                product = products.get(prod_id)
+                if product is None or available.get(prod_id, 0) < quantity:
+                    name = product.name if product else f'#{prod_id}'
                     messages.error(request,
-                                   f'Insufficient stock for {product.name}!')
-                    sale.delete()
+                                   f'Insufficient stock for {name}!')
                     return redirect('sale_create')
 
-                # Create sale item
-                SaleItem.objects.create(
-                    sale=sale,
-                    product=product,
-                    quantity=quantity,
-                    price=product.price
-                )
-
-                # Update stock
-                product.stock -= quantity
-                product.save()
-
-                # Create stock movement
-                StockMovement.objects.create(
-                    product=product,
-                    movement_type='out',
-                    quantity=quantity,
-                    reason=f'Sale #{sale.id}',
-                    user=request.user
-                )
-
-                total += product.price * quantity
+            # Promotions: one pass over the basket, no query per line
+            basket = price_basket([(products[prod_id], quantity)
+                                   for prod_id, quantity in needed.items()])
+
+            # Create sale
+            sale = Sale.objects.create(
+                user=request.user,
+                customer_id=customer_id if customer_id else None,
+                location=location,
+                payment_method=payment_method,
+                discount=Decimal(discount) if discount else 0,
+                discount_type=discount_type,  # NEW
+                notes=notes,
+                total=basket['total'],
+                promotion_discount=basket['promotion_discount'],
+            )
 
-        sale.total = total
-        sale.save()
+            SaleItem.objects.bulk_create([
+                SaleItem(sale=sale, product=line['product'],
+                         quantity=line['quantity'], price=line['price'],
+                         discount=line['discount'],
+                         promotion=line['promotion'])
+                for line in basket['lines']
+            ])
+
+            # Update stock and record the movements in bulk
+            move_stock(location, needed, 'out', f'Sale #{sale.id}',
+                       request.user)
+
+        record_customer_sale(sale)
+        metrics.increment('checkouts')
+        audit.record('sale_created', sale, request.user,
+                     total=sale.final_total, items=len(needed),
+                     promotion_discount=sale.promotion_discount,
+                     location=location.pk if location else None,
+                     customer=sale.customer_id)
 
         messages.success(request, f'Sale #{sale.id} created successfully!')
         return redirect('sale_detail', pk=sale.id)
 
-    products = Product.objects.filter(active=True, stock__gt=0)
-    customers = Customer.objects.all()
-
+    # Products (in stock here) and customers are searched through the
+    # autocomplete endpoints, so the page does not load either table
     context = {
-        'products': products,
-        'customers': customers,
         'payment_methods': Sale.PAYMENT_METHODS,
+        'location': current_location(request),
     }
 
     return render(request, 'store/sale_form.html', context)
 
 
+def _get_sale(pk):
+    # A live sale, or one already moved to the archive (read only)
+    sale = Sale.objects.filter(pk=pk).first()
+    if sale is None:
+        sale = get_object_or_404(ArchivedSale, pk=pk)
+    return sale
+
+
 @login_required
 def sale_detail(request, pk):
-    sale = get_object_or_404(Sale, pk=pk)
-    return render(request, 'store/sale_detail.html', {'sale': sale})
+    sale = _get_sale(pk)
+    return render(request, 'store/sale_detail.html',
+                  {'sale': sale,
+                   'archived': isinstance(sale, ArchivedSale)})
 
 
 @login_required
@@ -401,6 +574,11 @@ def sale_cancel(request, pk):
         messages.error(request, 'Esta venda já está cancelada!')
         return redirect('sale_detail', pk=pk)
 
+    if sale.day_close_id:
+        messages.error(request, 'O dia desta venda já foi fechado (Redução Z); '
+                                'ela não pode mais ser cancelada.')
+        return redirect('sale_detail', pk=pk)
+
     if request.method == 'POST':
         password = request.POST.get('password')
         reason = request.POST.get('reason', '')
@@ -413,27 +591,16 @@ def sale_cancel(request, pk):
                            'Senha incorreta ou usuário sem permissão de superuser!')
             return render(request, 'store/sale_cancel.html', {'sale': sale})
 
-        # Cancel sale
-        sale.status = 'cancelled'
-        sale.cancelled_at = timezone.now()
-        sale.cancellation_reason = reason
-        sale.cancelled_by = request.user
-        sale.save()
-
-        # Return stock
-        for item in sale.items.all():
-            product = item.product
-            product.stock += item.quantity
-            product.save()
-
-            # Create stock movement
-            StockMovement.objects.create(
-                product=product,
-                movement_type='in',
-                quantity=item.quantity,
-                reason=f'Cancelamento da Venda #{sale.id} - {reason}',
-                user=request.user
-            )
+        # Cancel sale, return its stock and update the customer stats in
+        # one transaction
+        try:
+            cancelled = cancel_sales([sale.pk], request.user, reason)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('sale_detail', pk=pk)
+        if not cancelled:
+            messages.error(request, 'Esta venda já está cancelada!')
+            return redirect('sale_detail', pk=pk)
 
         messages.success(request,
                          f'Venda #{sale.id} cancelada com sucesso! Estoque devolvido.')
@@ -444,19 +611,33 @@ def sale_cancel(request, pk):
 
 # STOCK VIEWS
 @login_required
+@read_from_replica
 def stock_movements(request):
     product_id = request.GET.get('product', '')
-    movements = StockMovement.objects.all()
+    location_id = request.GET.get('location', '')
+    filters = {}
 
     if product_id:
-        movements = movements.filter(product_id=product_id)
+        filters['product_id'] = product_id
 
-    products = Product.objects.filter(active=True)
+    if location_id:
+        filters['location_id'] = location_id
+
+    movements = StockMovement.objects.filter(**filters)
+    archived = ArchivedStockMovement.objects.filter(**filters) \
+        if reaches_archive(ArchivedStockMovement) else None
+
+    # The product filter is an autocomplete: only the selected one is read
+    selected_product_name = Product.objects.filter(
+        pk=product_id).values_list('name', flat=True).first() \
+        if product_id.isdigit() else ''
 
     context = {
-        'movements': movements[:100],
-        'products': products,
+        'movements': history_rows(movement_rows, movements, archived, 100),
+        'selected_product_name': selected_product_name,
+        'locations': cached_choices(Location.objects.filter(active=True)),
         'selected_product': product_id,
+        'selected_location': location_id,
     }
 
     return render(request, 'store/stock_movements.html', context)
@@ -467,34 +648,334 @@ def stock_adjustment(request):
     if request.method == 'POST':
         form = StockMovementForm(request.POST)
         if form.is_valid():
-            movement = form.save(commit=False)
-            movement.user = request.user
-            movement.save()
-
-            # Update product stock
-            product = movement.product
-            if movement.movement_type == 'in':
-                product.stock += movement.quantity
-            elif movement.movement_type == 'out':
-                product.stock -= movement.quantity
-            elif movement.movement_type == 'adjustment':
-                product.stock = movement.quantity
-
-            product.save()
+            data = form.cleaned_data
+            if data['movement_type'] == 'adjustment':
+                set_stock(data['location'], data['product'],
+                          data['quantity'], data['reason'], request.user)
+            else:
+                move_stock(data['location'],
+                           {data['product'].pk: data['quantity']},
+                           data['movement_type'], data['reason'],
+                           request.user)
+            audit.record('stock_adjusted', data['product'], request.user,
+                         type=data['movement_type'],
+                         quantity=data['quantity'],
+                         location=data['location'].pk, reason=data['reason'])
 
             messages.success(request, 'Stock updated successfully!')
             return redirect('stock_movements')
     else:
-        form = StockMovementForm()
+        form = StockMovementForm(
+            initial={'location': current_location(request)})
 
     return render(request, 'store/stock_adjustment.html', {'form': form})
 
 
+@login_required
+def stock_transfer(request):
+    if request.method == 'POST':
+        form = StockTransferForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            transfer_stock(data['source'], data['destination'],
+                           {data['product'].pk: data['quantity']},
+                           data['reason'], request.user)
+            audit.record('stock_adjusted', data['product'], request.user,
+                         type='transfer', quantity=data['quantity'],
+                         source=data['source'].pk,
+                         destination=data['destination'].pk,
+                         reason=data['reason'])
+            messages.success(
+                request,
+                f'{data["quantity"]} x {data["product"]} transferidos de '
+                f'{data["source"]} para {data["destination"]}.')
+            return redirect('stock_movements')
+    else:
+        form = StockTransferForm(
+            initial={'source': current_location(request)})
+
+    return render(request, 'store/stock_transfer.html', {'form': form})
+
+
+@login_required
+@require_POST
+def set_location(request):
+    location = get_object_or_404(Location, pk=request.POST.get('location'),
+                                 active=True)
+    request.session[SESSION_LOCATION_KEY] = location.pk
+
+    next_url = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(next_url,
+                                           allowed_hosts={request.get_host()}):
+        next_url = 'dashboard'
+    return redirect(next_url)
+
+
 # Receipt views
 @login_required
 def sale_receipt(request, pk):
-    sale = get_object_or_404(Sale, pk=pk)
+    sale = _get_sale(pk)
     return render(request, 'store/sale_receipt.html', {
         'sale': sale,
         'printed_at': timezone.now(),  # ← ADD THIS
     })
+
+
+# AUTOCOMPLETE
+@login_required
+@read_from_replica
+def product_autocomplete(request):
+    # ?q=<name or barcode>&page=N; &in_stock=1 limits to products with
+    # stock at the current location and adds that quantity
+    query = request.GET.get('q', '').strip()
+    products = Product.objects.filter(active=True)
+    if query:
+        products = products.filter(Q(name__icontains=query) |
+                                   Q(barcode=query))
+    if request.GET.get('in_stock'):
+        products = products.filter(
+            stock_levels__location=current_location(request),
+            stock_levels__quantity__gt=0,
+        ).annotate(location_stock=F('stock_levels__quantity'))
+    products = products.order_by('name', 'id')
+    return JsonResponse(autocomplete_page(
+        products, request.GET.get('page'),
+        lambda product: {
+            'id': product.pk,
+            'text': product.name,
+            'price': product.price,
+            'stock': getattr(product, 'location_stock', product.stock),
+        }))
+
+
+@login_required
+@read_from_replica
+def customer_autocomplete(request):
+    # ?q=<name, email, CPF or phone>&page=N
+    customers = search_customers(Customer.objects.all(),
+                                 request.GET.get('q', '')).order_by('name', 'id')
+    return JsonResponse(autocomplete_page(
+        customers, request.GET.get('page'),
+        lambda customer: {
+            'id': customer.pk,
+            'text': customer.name,
+            'detail': customer.cpf or customer.phone,
+        }))
+
+
+# ANALYTICS
+@login_required
+@read_from_replica
+def sales_series_api(request):
+    # JSON time series for charts: ?bucket=hour|day|week|month
+    # &date_from=&date_to= (YYYY-MM-DD) &group_by=payment_method|category
+    # &location=<id>
+    from .analytics import sales_series  # reports load on first use
+
+    bucket = request.GET.get('bucket', 'day')
+    group_by = request.GET.get('group_by') or None
+    location = request.GET.get('location') or None
+    try:
+        date_from, date_to = (
+            datetime.date.fromisoformat(request.GET[key])
+            if request.GET.get(key) else None
+            for key in ('date_from', 'date_to')
+        )
+        series = sales_series(bucket, date_from, date_to, group_by,
+                              int(location) if location else None)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    return JsonResponse({
+        'bucket': bucket,
+        'group_by': group_by,
+        'series': series,
+    })
+
+
+@login_required
+@read_from_replica
+def staffing_report(request):
+    # Weekday x hour heatmap + next week's forecast peaks (cached per week)
+    from .staffing import staffing_report as build_staffing_report
+
+    try:
+        weeks = min(max(int(request.GET.get('weeks', 52)), 4), 104)
+    except ValueError:
+        weeks = 52
+    return render(request, 'store/staffing_report.html', {
+        'report': build_staffing_report(weeks),
+        'hours': range(24),
+        'week_options': [4, 12, 26, 52, 104],
+    })
+
+
+# DAY CLOSE
+@login_required
+def day_close(request):
+    # Close a day at the current location and list the previous closes
+    location = current_location(request)
+    if request.method == 'POST':
+        form = DayCloseForm(request.POST)
+        if form.is_valid():
+            try:
+                close = close_day(form.cleaned_data['day'], location,
+                                  request.user, form.cleaned_data['force'])
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(
+                    request, f'Dia {close.day:%d/%m/%Y} fechado: '
+                             f'{close.sale_count} vendas, '
+                             f'R$ {close.total:.2f}.')
+                return redirect('day_close')
+    else:
+        form = DayCloseForm(initial={'day': timezone.localdate()})
+
+    closes = DayClose.objects.filter(location=location).select_related(
+        'closed_by')[:60]
+    return render(request, 'store/day_close.html', {
+        'form': form,
+        'location': location,
+        'closes': closes,
+    })
+
+
+@login_required
+def day_close_report(request, pk):
+    # Z-report, printed from the frozen totals
+    close = get_object_or_404(DayClose.objects.select_related(
+        'location', 'closed_by'), pk=pk)
+    return render(request, 'store/day_close_report.html', {
+        'close': close,
+        'printed_at': timezone.now(),
+    })
+
+
+# PURCHASING
+@login_required
+def purchase_order_list(request):
+    status = request.GET.get('status', 'pending')
+    orders = PurchaseOrder.objects.select_related(
+        'supplier', 'location').annotate(
+        line_count=Count('items'),
+        order_total=Sum(F('items__quantity') * F('items__unit_cost'),
+                        output_field=MONEY))
+    if status == 'pending':
+        orders = orders.filter(status__in=['open', 'partial'])
+    elif status:
+        orders = orders.filter(status=status)
+
+    return render(request, 'store/purchase_order_list.html', {
+        'orders': orders[:100],
+        'status': status,
+        'statuses': PurchaseOrder.STATUS_CHOICES,
+    })
+
+
+@login_required
+def purchase_order_create(request):
+    if request.method == 'POST':
+        form = PurchaseOrderForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            order = create_order(data['supplier'], data['location'],
+                                 data['lines'], request.user, data['notes'])
+            messages.success(request,
+                             f'Pedido #{order.pk} criado com '
+                             f'{len(data["lines"])} itens.')
+            return redirect('purchase_order_detail', pk=order.pk)
+    else:
+        form = PurchaseOrderForm(
+            initial={'location': current_location(request)})
+
+    return render(request, 'store/purchase_order_form.html', {'form': form})
+
+
+@login_required
+def purchase_order_detail(request, pk):
+    order = get_object_or_404(PurchaseOrder.objects.select_related(
+        'supplier', 'location', 'created_by'), pk=pk)
+    items = order.items.select_related('product').order_by('product__name')
+    return render(request, 'store/purchase_order_detail.html', {
+        'order': order,
+        'items': items,
+        'total': sum((item.subtotal for item in items), Decimal('0')),
+        'receipts': order.receipts.select_related('received_by').annotate(
+            line_count=Count('items')),
+    })
+
+
+@login_required
+def purchase_order_receive(request, pk):
+    # One post receives every line of the delivery (see receive_goods)
+    order = get_object_or_404(PurchaseOrder.objects.select_related(
+        'supplier', 'location'), pk=pk)
+    if not order.is_open:
+        messages.error(request, f'O pedido #{order.pk} não está aberto.')
+        return redirect('purchase_order_detail', pk=order.pk)
+
+    if request.method == 'POST':
+        form = GoodsReceiptForm(order, request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            try:
+                receipt = receive_goods(order, data['lines'], request.user,
+                                        data['invoice_number'], data['notes'])
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(
+                    request, f'Recebimento #{receipt.pk}: '
+                             f'{len(data["lines"])} itens lançados no estoque '
+                             f'de {order.location}.')
+                return redirect('purchase_order_detail', pk=order.pk)
+    else:
+        form = GoodsReceiptForm(order)
+
+    return render(request, 'store/purchase_order_receive.html',
+                  {'order': order, 'form': form})
+
+
+@login_required
+@require_POST
+def purchase_order_cancel(request, pk):
+    # What was already received stays in stock
+    order = get_object_or_404(PurchaseOrder, pk=pk)
+    if order.is_open:
+        order.status = 'cancelled'
+        order.save(update_fields=['status'])
+        messages.success(request, f'Pedido #{order.pk} cancelado.')
+    return redirect('purchase_order_detail', pk=order.pk)
+
+
+# HEALTH / METRICS
+# Open to the load balancer and the scraper: no login, no session
+def _checks_response(checks):
+    healthy = all(value == 'ok' for value in checks.values())
+    return JsonResponse({'status': 'ok' if healthy else 'error',
+                         'checks': checks},
+                        status=200 if healthy else 503)
+
+
+@require_safe
+def healthz(request):
+    return _checks_response(health.health())
+
+
+@require_safe
+def readyz(request):
+    return _checks_response(health.readiness())
+
+
+@require_safe
+def metrics_view(request):
+    # Served from in-process counters; METRICS_TOKEN, when set, must come
+    # as "Authorization: Bearer <token>"
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(
+            request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
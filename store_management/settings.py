@@ -28,8 +28,12 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get('SECRET_KEY')
 
+# Production profile: PRODUCTION=True turns debug off and pins the template
+# loaders (see TEMPLATES below)
+PRODUCTION = os.environ.get('PRODUCTION', 'False') == 'True'
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
 ALLOWED_HOSTS = ['*']
 
@@ -54,6 +58,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so request latency covers the whole stack
+    'store.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -62,8 +68,25 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'store.db_routers.ReplicaPinningMiddleware',
+    'store.audit.AuditMiddleware',
+    'store.profiling.RequestProfilingMiddleware',
 ]
 
+# Profile every request (tracemalloc + cProfile, see store/profiling.py).
+# Superusers can also profile a single request with the "X-Profile: 1" header
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', 'False') == 'True'
+
+# /metrics (see store/metrics.py): counters are per process. The low stock
+# gauge is recounted every METRICS_LOW_STOCK_INTERVAL seconds by a
+# background thread, never while serving a scrape; set
+# METRICS_TOKEN to require "Authorization: Bearer <token>" from the scraper
+METRICS_LOW_STOCK_INTERVAL = 60
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Audit events are buffered and written in bulk (see store/audit.py)
+AUDIT_BATCH_SIZE = 100
+
 ROOT_URLCONF = 'store_management.urls'
 
 TEMPLATES = [
@@ -76,11 +99,26 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'store.context_processors.locations',
             ],
         },
     },
 ]
 
+if PRODUCTION:
+    # Templates are read and compiled once per process and kept in memory;
+    # template debug info (origins, line numbers) is not collected
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS'].update({
+        'debug': False,
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    })
+
 WSGI_APPLICATION = 'store_management.wsgi.application'
 
 
@@ -96,6 +134,38 @@ DATABASES = {
     )
 }
 
+# Production server profile: each web thread holds at most one database
+# connection, so the psycopg pool is sized to the threads of one server
+# process (Waitress: one process; Gunicorn: one pool per worker).
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 8))
+
+if (os.environ.get('DB_POOL', 'False') == 'True' and
+        DATABASES['default'].get('ENGINE') == 'django.db.backends.postgresql'):
+    # The pool replaces persistent connections (Django requires 0 here)
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': 2,
+        'max_size': WEB_THREADS,
+        'timeout': 10,  # seconds a request waits for a free connection
+        'max_idle': 300,
+        'max_lifetime': 1800,
+    }
+
+# Optional read replica: report and list views read from it (see
+# store/db_routers.py), writes and read-after-write stay on 'default'
+if os.environ.get('REPLICA_DATABASE_URL'):
+    DATABASES['replica'] = dj_database_url.parse(
+        os.environ['REPLICA_DATABASE_URL'],
+        conn_max_age=600,
+        conn_health_checks=True,
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['store.db_routers.ReplicaRouter']
+REPLICA_MAX_LAG = 5  # seconds behind before falling back to the primary
+REPLICA_LAG_CHECK_INTERVAL = 5
+REPLICA_PIN_SECONDS = 10
+
 # SqLite
 # DATABASES = {
 #     'default': {
@@ -132,6 +202,20 @@ MEDIA_ROOT = BASE_DIR / 'media'
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic fingerprints file names and writes .gz / .br copies;
+# WhiteNoise serves the hashed files with far-future immutable headers
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+# Old templates reference a few files that are not shipped; serve those
+# unhashed instead of failing the page
+WHITENOISE_MANIFEST_STRICT = False
+
 # Language
 LANGUAGE_CODE = 'pt-br'
 TIME_ZONE = 'America/Sao_Paulo'